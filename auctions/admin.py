@@ -1,11 +1,144 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 # Register your models here.
-from .models import Bid, Category, Comment, Listing, User, Watchlist
-
-admin.site.register(Category)
-admin.site.register(Listing)
-admin.site.register(Bid)
-admin.site.register(User)
-admin.site.register(Watchlist)
-admin.site.register(Comment)
+from .models import Bid, Category, Comment, Job, Listing, User, Watchlist
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Counts at most MAX_COUNT rows, so that paging through millions of bids
+    doesn't COUNT(*) the whole table on every page; narrow down with the
+    filters to reach older rows
+    """
+
+    MAX_COUNT = 10000
+
+    @cached_property
+    def count(self):
+        return self.object_list[: self.MAX_COUNT].count()
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """ Change lists that stay fast on large tables """
+
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ("title",)
+    search_fields = ("title",)
+    ordering = ("title",)
+
+
+@admin.register(Listing)
+class ListingAdmin(ScalableAdmin):
+    list_display = (
+        "title",
+        "user",
+        "category",
+        "current_price",
+        "bid_count",
+        "closed",
+        "ends_at",
+        "created_at",
+    )
+    list_select_related = ("user", "category")
+    # open listings are filtered through the partial open-listing indexes
+    list_filter = ("closed",)
+    search_fields = ("title",)
+    autocomplete_fields = ("user", "category")
+    raw_id_fields = ("high_bidder", "winner")
+    # the bid summary is maintained by bid placement and closing, and
+    # Listing.save() refuses to write it
+    readonly_fields = (
+        "closed",
+        "current_price",
+        "bid_count",
+        "high_bidder",
+        "winner",
+        "closed_at",
+        "version",
+        "updated_at",
+    )
+
+
+@admin.register(Bid)
+class BidAdmin(ScalableAdmin):
+    list_display = ("id", "listing", "user", "amount", "created_at")
+    list_select_related = ("listing", "user")
+    list_filter = ("created_at",)
+    raw_id_fields = ("listing", "user")
+    # walks bid_created_idx backwards
+    ordering = ("-created_at", "-id")
+
+
+@admin.register(Comment)
+class CommentAdmin(ScalableAdmin):
+    list_display = ("id", "listing", "user", "created_at")
+    list_select_related = ("listing", "user")
+    list_filter = ("created_at",)
+    raw_id_fields = ("listing", "user")
+
+
+@admin.register(Watchlist)
+class WatchlistAdmin(ScalableAdmin):
+    list_display = ("user", "listing", "deleted", "modified_at")
+    list_select_related = ("user", "listing")
+    list_filter = ("deleted",)
+    raw_id_fields = ("user", "listing")
+
+
+@admin.register(Job)
+class JobAdmin(ScalableAdmin):
+    list_display = ("id", "kind", "attempts", "run_after", "failed", "created_at")
+    list_filter = ("failed", "kind")
+    readonly_fields = ("attempts", "claimed_by", "last_error", "created_at")
+    actions = ("retry_jobs",)
+
+    def retry_jobs(self, request, queryset):
+        retried = queryset.update(
+            failed=False, attempts=0, run_after=timezone.now(), last_error=""
+        )
+        self.message_user(request, f"Queued {retried} jobs to run again")
+
+    retry_jobs.short_description = "Run the selected jobs again"
+
+
+@admin.register(User)
+class AuctionUserAdmin(UserAdmin):
+    list_display = UserAdmin.list_display + ("bid_count",)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # a correlated subquery is only evaluated for the rows on the page,
+        # unlike a join + GROUP BY over the whole bids table
+        bid_counts = (
+            Bid.objects.filter(user=OuterRef("pk"))
+            .order_by()
+            .values("user")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                bid_count=Coalesce(Subquery(bid_counts, output_field=IntegerField()), 0)
+            )
+        )
+
+    def bid_count(self, user):
+        return user.bid_count
+
+    bid_count.short_description = "Bids"
+    bid_count.admin_order_field = "bid_count"
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class AuctionsConfig(AppConfig):
     name = 'auctions'
+
+    def ready(self):
+        from .search import install_search_triggers
+        from .sqlite import configure_connection
+
+        post_migrate.connect(install_search_triggers, sender=self)
+        connection_created.connect(configure_connection)
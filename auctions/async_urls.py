@@ -0,0 +1,24 @@
+from django.urls import path
+
+from . import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    "index": async_views.index,
+    "categories": async_views.get_categories,
+    "category_listings": async_views.get_categories_listings,
+    "get_listing": async_views.get_listing,
+    "listing_comments": async_views.get_listing_comments,
+    "dashboard": async_views.dashboard,
+    "watchlist": async_views.get_watchlist,
+}
+
+# the same routes as auctions.urls, with async views for the read-only pages
+urlpatterns = [
+    path(
+        str(pattern.pattern),
+        ASYNC_VIEWS.get(pattern.name, pattern.callback),
+        name=pattern.name,
+    )
+    for pattern in sync_urlpatterns
+]
@@ -0,0 +1,76 @@
+""" Async versions of the read-only views, served under commerce.asgi """
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from . import views
+from .middleware import recording_queries
+
+
+def read_only(view):
+    """
+    Run a read-only sync view in the default thread pool
+
+    Django runs sync views in a single thread-sensitive thread under ASGI,
+    so concurrent requests queue behind each other. Read-only views don't
+    need that guarantee and can run in parallel worker threads, each with
+    its own database connection, closed or kept per CONN_MAX_AGE, whose
+    queries are recorded for QueryInstrumentationMiddleware.
+    """
+
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            with recording_queries():
+                return view(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+async def index(request):
+    """ Home page - Displays all active listings """
+
+    return await read_only(views.index)(request)
+
+
+async def get_categories(request):
+    """ Returns a list of categories with active listings """
+
+    return await read_only(views.get_categories)(request)
+
+
+async def get_categories_listings(request, category_id):
+    """ Returns a list of active listings for a given category """
+
+    return await read_only(views.get_categories_listings)(request, category_id)
+
+
+async def get_listing(request, listing_id):
+    """ Listing detail page, POSTs (bids, comments, closing) stay synchronous """
+
+    if request.method == "POST":
+        return await sync_to_async(views.get_listing, thread_sensitive=True)(
+            request, listing_id
+        )
+
+    return await read_only(views.get_listing)(request, listing_id)
+
+
+async def get_listing_comments(request, listing_id):
+    """ HTML fragment with the next page of a listing's comments """
+
+    return await read_only(views.get_listing_comments)(request, listing_id)
+
+
+async def dashboard(request):
+    """ The user's bids with their standing, auctions won and own listings """
+
+    return await read_only(views.dashboard)(request)
+
+
+async def get_watchlist(request):
+    """ Returns listings that user is watching """
+
+    return await read_only(views.get_watchlist)(request)
@@ -0,0 +1,146 @@
+""" Bid placement and auction closing """
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import Bid, Listing
+
+
+class BidError(Exception):
+    """ Raised when a bid can't be placed on a listing """
+
+
+class BidSummary:
+    """ Current price, high bidder and number of bids for one listing """
+
+    def __init__(self, amount, username, count):
+        self.amount = amount
+        self.username = username
+        self.count = count
+
+    @classmethod
+    def for_listing(cls, listing):
+        """
+        Build the summary from the listing's stored bid fields, load the
+        listing with select_related("high_bidder") to avoid a user query
+        """
+
+        return cls(
+            listing.current_price, listing.highest_bid_username, listing.bid_count
+        )
+
+
+def place_bid(listing, user, amount):
+    """
+    Validate and place a bid on a listing
+
+    The listing row is only updated if the bid still beats the current price
+    at the moment the UPDATE runs, so the check and the write are a single
+    compare-and-set and two bidders can never both win with the same amount.
+    The Bid row is inserted in the same transaction, along with the job that
+    tells the previous high bidder they were outbid. Returns the new Bid or
+    raises BidError if the bid was rejected.
+    """
+
+    if amount <= 0:
+        raise BidError("Your bid must be greater than $0.00")
+
+    with transaction.atomic():
+        updated = (
+            Listing.objects.filter(pk=listing.pk, closed=False)
+            .filter(Q(ends_at__isnull=True) | Q(ends_at__gt=timezone.now()))
+            .exclude(user=user)
+            .filter(
+                # the first bid may match the starting bid, later bids must beat it
+                Q(current_price__lt=amount)
+                | Q(bid_count=0, current_price__lte=amount)
+            )
+            .update(
+                current_price=amount,
+                bid_count=F("bid_count") + 1,
+                high_bidder=user,
+                version=F("version") + 1,
+                updated_at=timezone.now(),
+            )
+        )
+
+        if updated:
+            bid = Bid.objects.create(amount=amount, listing_id=listing.pk, user=user)
+            enqueue("notify_outbid", bid_id=bid.pk)
+            return bid
+
+    raise BidError(get_rejection_reason(listing.pk, user))
+
+
+def get_rejection_reason(listing_id, user):
+    """ Explain why a bid on the listing lost the compare-and-set """
+
+    listing = Listing.objects.values(
+        "closed", "ends_at", "user_id", "current_price", "bid_count"
+    ).get(pk=listing_id)
+
+    if listing["closed"]:
+        return "This auction is closed"
+
+    if listing["ends_at"] and listing["ends_at"] <= timezone.now():
+        return "This auction has ended"
+
+    if listing["user_id"] == user.id:
+        return "You can't bid on your own listing"
+
+    if not listing["bid_count"]:
+        return f"Your bid must be at least ${listing['current_price']}"
+
+    return (
+        f"Your bid must be higher than the current bid of ${listing['current_price']}"
+    )
+
+
+def close_listings(listings, now=None):
+    """
+    Close the open listings of a queryset with a single UPDATE
+
+    The winner is whoever holds the high bid when the UPDATE runs, so a bid
+    racing the close either lands first and wins or is rejected as closed.
+    Returns the number of listings closed.
+    """
+
+    now = now or timezone.now()
+
+    return listings.filter(closed=False).update(
+        closed=True,
+        closed_at=now,
+        winner=F("high_bidder"),
+        version=F("version") + 1,
+        updated_at=now,
+    )
+
+
+def close_auction(listing, user):
+    """
+    Close a listing on behalf of its seller and queue the job emailing the
+    winner, False if user isn't the seller
+    """
+
+    with transaction.atomic():
+        closed = close_listings(Listing.objects.filter(pk=listing.pk, user=user))
+        if closed:
+            enqueue("notify_winner", listing_id=listing.pk)
+
+    return bool(closed)
+
+
+def get_expired_listing_ids(now, limit):
+    """
+    Ids of up to limit open listings whose end time has passed, soonest first
+
+    A range scan of listing_open_expiry_idx, no sort needed.
+    """
+
+    return list(
+        Listing.objects.filter(closed=False, ends_at__lte=now)
+        .order_by("ends_at")
+        .values_list("pk", flat=True)[:limit]
+    )
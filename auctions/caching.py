@@ -0,0 +1,154 @@
+""" Cached values shared between views, with explicit invalidation """
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Max
+
+from .models import Category, Listing, Watchlist
+
+# counts are invalidated whenever they change, but only in the cache of the
+# process making the change unless CACHES is shared (see settings), so the
+# timeout bounds how long other processes show an old count
+WATCHLIST_COUNT_TIMEOUT = 30
+# the categories key follows listing creation and closing, the timeout bounds
+# staleness after changes it doesn't see, listings edited or deleted
+CATEGORIES_TIMEOUT = 60 * 60
+
+# card keys carry the listing version, so entries are never stale and the
+# timeout only lets the cache reclaim cards of listings nobody looks at
+LISTING_CARD_TIMEOUT = 24 * 60 * 60
+
+# fragment caches that report hit/miss counts through get_cache_stats()
+STATS_NAMES = ["listing_cards"]
+
+
+def watchlist_count_key(user_id):
+    return f"watchlist_count:{user_id}"
+
+
+def get_watchlist_count(user):
+    """ Return the number of listings the user is watching """
+
+    return cache.get_or_set(
+        watchlist_count_key(user.pk),
+        lambda: Watchlist.objects.filter(user=user, deleted=False).count(),
+        WATCHLIST_COUNT_TIMEOUT,
+    )
+
+
+def invalidate_watchlist_count(user):
+    """ Drop the cached watchlist count after the user's watchlist changes """
+
+    cache.delete(watchlist_count_key(user.pk))
+
+
+def active_categories_key():
+    """
+    Key of the cached categories, made of the newest listing creation and
+    close, from two index seeks (listing_created_idx, listing_closed_idx)
+
+    Creating or closing a listing in any process (the sweeper, imports) so
+    moves every process on to a fresh entry, no invalidation is needed.
+    Read from the primary: a lagging replica would key the old list anew.
+    """
+
+    listings = Listing.objects.using(DEFAULT_DB_ALIAS)
+    created = listings.order_by("-created_at").values_list("created_at", flat=True)
+    closed = (
+        listings.filter(closed_at__isnull=False)
+        .order_by("-closed_at")
+        .values_list("closed_at", flat=True)
+    )
+
+    stamps = [
+        latest.timestamp() if latest else 0
+        for latest in (created.first(), closed.first())
+    ]
+
+    return "active_categories:{}:{}".format(*stamps)
+
+
+def get_active_categories():
+    """
+    Return every category with open listings once, with its number of open
+    listings and the time of its newest one, from a single grouped query
+    """
+
+    return cache.get_or_set(
+        active_categories_key(),
+        lambda: list(
+            Category.objects.using(DEFAULT_DB_ALIAS)
+            .filter(listings__closed=False)
+            .annotate(
+                active_listing_count=Count("listings"),
+                latest_listing_at=Max("listings__created_at"),
+            )
+            .order_by("title")
+            .values("id", "title", "active_listing_count", "latest_listing_at")
+        ),
+        CATEGORIES_TIMEOUT,
+    )
+
+
+def listing_card_key(listing):
+    return f"listing_card:{listing.pk}:{listing.version}"
+
+
+def get_listing_cards(listings, render_card):
+    """
+    Return the rendered card of each listing, in order, rendering and caching
+    only the ones missing from the cache, with one get_many and one set_many
+    """
+
+    keys = [listing_card_key(listing) for listing in listings]
+    cards = cache.get_many(keys)
+
+    missing = {
+        key: render_card(listing)
+        for key, listing in zip(keys, listings)
+        if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, LISTING_CARD_TIMEOUT)
+        cards.update(missing)
+    record_cache_stats("listing_cards", len(keys) - len(missing), len(missing))
+
+    return [cards[key] for key in keys]
+
+
+def stats_key(name, outcome):
+    return f"cache_stats:{name}:{outcome}"
+
+
+def record_cache_stats(name, hits, misses):
+    """ Add to the hit and miss counters of a fragment cache """
+
+    for outcome, count in (("hits", hits), ("misses", misses)):
+        if count:
+            key = stats_key(name, outcome)
+            cache.add(key, 0, None)
+            cache.incr(key, count)
+
+
+def get_cache_stats():
+    """ Hits, misses and hit ratio of each fragment cache since the counters started """
+
+    counters = cache.get_many(
+        [
+            stats_key(name, outcome)
+            for name in STATS_NAMES
+            for outcome in ("hits", "misses")
+        ]
+    )
+
+    stats = {}
+    for name in STATS_NAMES:
+        hits = counters.get(stats_key(name, "hits"), 0)
+        misses = counters.get(stats_key(name, "misses"), 0)
+        stats[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else None,
+        }
+
+    return stats
@@ -0,0 +1,91 @@
+""" Conditional GET (ETag / Last-Modified) for pages that vary per user """
+
+import hashlib
+
+from django.contrib import messages
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .caching import get_watchlist_count
+from .models import Listing
+
+
+def conditional_page(get_last_modified, get_viewer_state=None):
+    """
+    django.views.decorators.http.condition for the auction pages
+
+    get_last_modified(*view_args) returns when the page's listings last
+    changed, looked up once per request. The ETag adds the user and their
+    watchlist count, which shows in the navbar, and for signed in users
+    whatever get_viewer_state(request, *view_args) returns, for the parts
+    of the page that only depend on the user (its watchlist button).
+    Nothing is sent (and nothing is 304) for POSTs, or while flash messages
+    are waiting to be shown.
+    """
+
+    def last_modified(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return None
+        if len(messages.get_messages(request)):
+            return None
+
+        if not hasattr(request, "_page_last_modified"):
+            try:
+                request._page_last_modified = get_last_modified(*args, **kwargs)
+            except ValueError:
+                # malformed ids are left to the view
+                request._page_last_modified = None
+
+        return request._page_last_modified
+
+    def etag(request, *args, **kwargs):
+        modified = last_modified(request, *args, **kwargs)
+        if modified is None:
+            return None
+
+        viewer = "anonymous"
+        if request.user.is_authenticated:
+            viewer = f"{request.user.pk}:{get_watchlist_count(request.user)}"
+            if get_viewer_state is not None:
+                viewer += f":{get_viewer_state(request, *args, **kwargs)}"
+
+        return hashlib.md5(f"{modified.isoformat()}:{viewer}".encode()).hexdigest()
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def latest_update(listings):
+    return listings.order_by("-updated_at").values_list("updated_at", flat=True).first()
+
+
+def listings_last_modified():
+    """
+    The newest change to any listing, closed ones included, since closing
+    takes a listing off the list pages (listing_updated_idx)
+    """
+
+    return latest_update(Listing.objects.all())
+
+
+def category_listings_last_modified(category_id):
+    """ The newest change to a listing of the category (listing_category_updated_idx) """
+
+    return latest_update(Listing.objects.filter(category_id=category_id))
+
+
+def listing_last_modified(listing_id):
+    """
+    When the listing last changed: a bid, comment, edit or close, or its end
+    time passing, which hides the bid form before the sweeper gets to it
+    """
+
+    listing = Listing.objects.filter(pk=listing_id).values("updated_at", "ends_at")
+    listing = listing.first()
+    if listing is None:
+        return None
+
+    ends_at = listing["ends_at"]
+    if ends_at and listing["updated_at"] < ends_at <= timezone.now():
+        return ends_at
+
+    return listing["updated_at"]
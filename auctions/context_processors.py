@@ -1,16 +1,14 @@
 """ To pass context to all views """
 from django.contrib.auth.decorators import login_required
 
-from .models import Watchlist
+from .caching import get_watchlist_count
 
 
 def add_watchlist_count_to_context(request):
     """ Adds the user's watchlist count on every view for layout/navbar """
 
     if request.user.is_authenticated:
-        watchlist_count = Watchlist.objects.filter(
-            user=request.user, deleted=False
-        ).count()
+        watchlist_count = get_watchlist_count(request.user)
 
         return {
             "watchlist_count": watchlist_count,
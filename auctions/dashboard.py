@@ -0,0 +1,58 @@
+""" Queries behind the per-user dashboard, one per section """
+
+from django.db.models import Case, CharField, OuterRef, Subquery, Value, When
+
+from .models import Bid, Listing
+
+
+def get_own_listings(user, limit):
+    """ The user's newest listings, open and closed """
+
+    return list(
+        Listing.objects.filter(user=user)
+        .select_related("category", "high_bidder", "winner")
+        .order_by("-created_at", "-pk")[:limit]
+    )
+
+
+def get_bidding_listings(user, limit):
+    """
+    Open listings the user has bid on, most recently bid on first, each with
+    my_bid (the user's highest bid) and status ("leading" or "outbid")
+
+    The listings are found from the user's bids (the bid user index) rather
+    than by probing every open listing, the user's own bids by correlated
+    subqueries over bid_listing_amount_idx, and the lead from the listing's
+    stored high bidder, so this is one query however many listings the user
+    bids on.
+    """
+
+    user_bids = Bid.objects.filter(listing=OuterRef("pk"), user=user)
+    bid_on = Bid.objects.filter(user=user).values("listing")
+
+    return list(
+        Listing.objects.filter(pk__in=bid_on, closed=False)
+        .annotate(
+            my_bid=Subquery(user_bids.order_by("-amount").values("amount")[:1]),
+            last_bid_at=Subquery(
+                user_bids.order_by("-created_at").values("created_at")[:1]
+            ),
+            status=Case(
+                When(high_bidder=user, then=Value("leading")),
+                default=Value("outbid"),
+                output_field=CharField(),
+            ),
+        )
+        .select_related("category")
+        .order_by("-last_bid_at", "-pk")[:limit]
+    )
+
+
+def get_won_listings(user, limit):
+    """ Auctions the user won, most recently closed first """
+
+    return list(
+        Listing.objects.filter(winner=user)
+        .select_related("category", "user")
+        .order_by("-closed_at", "-pk")[:limit]
+    )
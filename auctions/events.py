@@ -0,0 +1,252 @@
+""" In-process pub/sub of live listing updates, streamed as Server-Sent Events """
+
+import asyncio
+import json
+import queue
+import re
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections
+
+from .models import Listing
+
+# served by listing_events_asgi under commerce.asgi, views.listing_events otherwise
+EVENTS_PATH = re.compile(r"^/listing/(?P<listing_id>\d+)/events$")
+
+# set by commerce.asgi on the scope of the requests it hands to Django
+STREAMING_SCOPE_KEY = "listing_events"
+
+
+class Subscription:
+    """ A thread-side subscriber, one per open event stream """
+
+    def __init__(self, listing_id):
+        self.listing_id = listing_id
+        self.queue = queue.Queue(maxsize=settings.LISTING_EVENTS_BUFFER)
+
+    def deliver(self, event):
+        # every event carries the full listing state, so a slow reader only
+        # needs the newest ones: drop the oldest rather than block publishers
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout):
+        """ Next event, or None if nothing was published within timeout """
+
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """ An event-loop-side subscriber, fed thread-safely from publishers """
+
+    def __init__(self, listing_id, loop):
+        self.listing_id = listing_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=settings.LISTING_EVENTS_BUFFER)
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self.put_latest, event)
+        except RuntimeError:
+            # the subscriber's event loop has already shut down
+            pass
+
+    def put_latest(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ListingEventBroker:
+    """
+    Fan-out of listing updates to the subscribers in this process
+
+    Publishing costs one query per update however many clients are watching,
+    and each watcher is just a queue. Subscribers in other processes aren't
+    reached, so run a single process per site (or one per sticky shard).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+
+    def subscribe(self, subscription):
+        with self.lock:
+            self.subscribers.setdefault(subscription.listing_id, set()).add(
+                subscription
+            )
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            listing_subscribers = self.subscribers.get(subscription.listing_id, set())
+            listing_subscribers.discard(subscription)
+            if not listing_subscribers:
+                self.subscribers.pop(subscription.listing_id, None)
+
+    def has_subscribers(self, listing_id):
+        return listing_id in self.subscribers
+
+    def publish(self, listing_id, event):
+        with self.lock:
+            subscribers = list(self.subscribers.get(listing_id, ()))
+
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+
+broker = ListingEventBroker()
+
+
+def get_listing_state(listing_id, using=None):
+    """ The listing fields pushed to watchers """
+
+    # public, anonymous watchers included: the listing page only names the
+    # high bidder to the seller
+    listing = (
+        Listing.objects.using(using)
+        .only("closed", "current_price", "bid_count")
+        .get(pk=listing_id)
+    )
+
+    return {
+        "listing": listing.pk,
+        "current_price": str(listing.current_price),
+        "bid_count": listing.bid_count,
+        "closed": listing.closed,
+    }
+
+
+def live_updates_enabled(request):
+    """
+    Whether pages may open listing event streams: only when served by
+    commerce.asgi, where a watcher is a coroutine rather than a thread
+    """
+
+    return getattr(request, "scope", {}).get(STREAMING_SCOPE_KEY, False)
+
+
+def publish_listing(listing_id):
+    """
+    Push the listing's current state to its watchers, call it after the
+    change is committed (transaction.on_commit)
+    """
+
+    if broker.has_subscribers(listing_id):
+        # from the primary, a replica may not have the change yet
+        broker.publish(listing_id, get_listing_state(listing_id, DEFAULT_DB_ALIAS))
+
+
+def format_event(event):
+    """ Encode a state dict as an SSE message, or a keepalive comment """
+
+    if event is None:
+        return ": keepalive\n\n"
+
+    return f"event: listing\ndata: {json.dumps(event)}\n\n"
+
+
+def stream_listing_events(listing_id):
+    """
+    Generator of SSE messages for views.listing_events (sync servers)
+
+    A long poll: the current state, then the next update if one comes
+    within LISTING_EVENTS_KEEPALIVE seconds, and the stream ends (browsers
+    reconnect), so a watcher holds a worker thread for seconds, not for
+    minutes. Listing pages don't open streams on sync servers.
+    """
+
+    subscription = broker.subscribe(Subscription(listing_id))
+    try:
+        yield format_event(get_listing_state(listing_id))
+        close_old_connections()
+
+        event = subscription.get(settings.LISTING_EVENTS_KEEPALIVE)
+        if event is not None:
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def listing_events_asgi(scope, receive, send):
+    """
+    Raw ASGI app for the listing event stream
+
+    Django 3.1 iterates streaming responses synchronously on the event loop,
+    which would block every other request while a stream waits, so under
+    ASGI the stream is served here with one coroutine per watcher.
+    """
+
+    listing_id = int(EVENTS_PATH.match(scope["path"])["listing_id"])
+    subscription = broker.subscribe(
+        AsyncSubscription(listing_id, asyncio.get_running_loop())
+    )
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+
+    try:
+        try:
+            event = await sync_to_async(get_listing_state, thread_sensitive=False)(
+                listing_id
+            )
+        except Listing.DoesNotExist:
+            await send({"type": "http.response.start", "status": 404, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+
+        deadline = time.monotonic() + settings.LISTING_EVENTS_MAX_DURATION
+        while time.monotonic() < deadline:
+            body = format_event(event).encode()
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+
+            next_event = asyncio.ensure_future(
+                subscription.get(settings.LISTING_EVENTS_KEEPALIVE)
+            )
+            await asyncio.wait(
+                {next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnected.done():
+                next_event.cancel()
+                return
+            event = next_event.result()
+
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        disconnected.cancel()
+        broker.unsubscribe(subscription)
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
@@ -0,0 +1,116 @@
+""" Streaming JSON / JSON Lines feeds of listings and bids for analytics """
+
+import itertools
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Bid, Listing
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "jsonl": "application/x-ndjson",
+}
+
+LISTING_FIELDS = [
+    "id",
+    "title",
+    "description",
+    "user__username",
+    "category__title",
+    "starting_bid",
+    "current_price",
+    "bid_count",
+    "high_bidder__username",
+    "closed",
+    "created_at",
+    "ends_at",
+    "closed_at",
+    "winner__username",
+]
+
+BID_FIELDS = ["id", "listing_id", "user__username", "amount", "created_at"]
+
+
+def encode_rows(rows, export_format, batch_size):
+    """
+    Encode rows as a JSON array or as JSON Lines, a batch of rows per chunk
+    so that the server isn't asked to write one tiny chunk per row
+    """
+
+    encode = DjangoJSONEncoder().encode
+    separator = "\n" if export_format == "jsonl" else ",\n"
+
+    if export_format == "json":
+        yield "[\n"
+
+    first = True
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+
+        chunk = separator.join(encode(row) for row in batch)
+        if export_format == "jsonl":
+            yield chunk + "\n"
+        else:
+            yield chunk if first else separator + chunk
+        first = False
+
+    if export_format == "json":
+        yield "\n]\n"
+
+
+def export_response(request, queryset, fields):
+    """
+    Stream queryset, oldest first, in the requested format
+
+    ?format=json|jsonl picks the encoding, ?since=<ISO datetime> only returns
+    rows created after that time, for incremental exports.
+    """
+
+    export_format = request.GET.get("format", "jsonl")
+    if export_format not in CONTENT_TYPES:
+        return HttpResponseBadRequest("format must be json or jsonl")
+
+    since = request.GET.get("since")
+    if since:
+        try:
+            since = parse_datetime(since)
+        except ValueError:
+            since = None
+        if since is None:
+            return HttpResponseBadRequest("since must be an ISO 8601 datetime")
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        queryset = queryset.filter(created_at__gt=since)
+
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    rows = (
+        queryset.order_by("created_at", "pk")
+        .values(*fields)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    return StreamingHttpResponse(
+        encode_rows(rows, export_format, chunk_size),
+        content_type=CONTENT_TYPES[export_format],
+    )
+
+
+@staff_member_required
+def export_listings(request):
+    """ All listings with their current price and bid summary """
+
+    return export_response(request, Listing.objects.all(), LISTING_FIELDS)
+
+
+@staff_member_required
+def export_bids(request):
+    """ All bids """
+
+    return export_response(request, Bid.objects.all(), BID_FIELDS)
@@ -0,0 +1,153 @@
+""" Bulk import of listings from CSV or JSON Lines files """
+
+import csv
+import json
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Category, Listing
+
+FORMATS = ("csv", "jsonl")
+
+# fields set by the importer rather than read from the file
+NOT_VALIDATED = ["user", "category", "high_bidder"]
+
+
+class ImportRowError(Exception):
+    """ A row that can't be turned into a listing, reported and skipped """
+
+
+def read_rows(lines, file_format):
+    """ Yield (line number, row dict or ImportRowError) from an open file """
+
+    if file_format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield line_number, ImportRowError(f"invalid JSON: {error}")
+            continue
+        if not isinstance(row, dict):
+            yield line_number, ImportRowError("expected a JSON object")
+            continue
+        yield line_number, row
+
+
+def text_value(row, field):
+    """ A row's value as stripped text, JSON rows may hold numbers or objects """
+
+    value = row.get(field)
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        raise ImportRowError(f"{field}: Expected text.")
+
+    return str(value).strip()
+
+
+class CategoryCache:
+    """
+    Category ids by title, loaded once and extended as new titles are met
+
+    Titles aren't unique in the table, the first (oldest) match wins.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        for pk, title in Category.objects.order_by("-pk").values_list("pk", "title"):
+            self.ids[title] = pk
+        self.created = 0
+
+    def get_id(self, title):
+        if title not in self.ids:
+            self.ids[title] = Category.objects.create(title=title).pk
+            self.created += 1
+
+        return self.ids[title]
+
+
+class ListingImporter:
+    """
+    Validate rows into Listings and insert them with bulk_create in batches
+
+    Rows that fail validation are collected in errors and never stop the
+    import. Each batch is its own transaction.
+    """
+
+    def __init__(self, user, batch_size=1000):
+        self.user = user
+        self.batch_size = batch_size
+        self.categories = CategoryCache()
+        self.imported = 0
+        self.errors = []
+
+    def build_listing(self, row):
+        """ A validated, unsaved Listing for one row """
+
+        category = text_value(row, "category")
+        if not category:
+            raise ImportRowError("category: This field cannot be blank.")
+        if len(category) > Category._meta.get_field("title").max_length:
+            raise ImportRowError("category: Title is too long.")
+
+        listing = Listing(
+            title=text_value(row, "title"),
+            description=text_value(row, "description"),
+            image_url=text_value(row, "image_url") or None,
+            starting_bid=row.get("starting_bid") or 0,
+            user=self.user,
+        )
+        try:
+            listing.full_clean(exclude=NOT_VALIDATED)
+        except ValidationError as error:
+            raise ImportRowError(
+                "; ".join(
+                    f"{field}: {' '.join(messages)}"
+                    for field, messages in error.message_dict.items()
+                )
+            )
+
+        # bulk_create skips Listing.save(), price new listings here instead
+        listing.current_price = listing.starting_bid
+        listing.category_id = self.categories.get_id(category)
+
+        return listing
+
+    def run(self, rows):
+        """ Import (line number, row) pairs, returns the rows/sec achieved """
+
+        started = time.perf_counter()
+        batch = []
+        for line_number, row in rows:
+            try:
+                if isinstance(row, ImportRowError):
+                    raise row
+                batch.append(self.build_listing(row))
+            except ImportRowError as error:
+                self.errors.append((line_number, str(error)))
+
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        self.flush(batch)
+
+        elapsed = time.perf_counter() - started
+
+        return (self.imported + len(self.errors)) / elapsed if elapsed else 0
+
+    def flush(self, batch):
+        if not batch:
+            return
+
+        with transaction.atomic():
+            Listing.objects.bulk_create(batch)
+        self.imported += len(batch)
@@ -0,0 +1,221 @@
+""" Durable background jobs, queued in the database and run by run_worker """
+
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Bid, Job, JobCounter, Listing
+
+STATS_OUTCOMES = ["done", "retried", "failed"]
+
+
+def enqueue(kind, **payload):
+    """
+    Queue a job for the worker
+
+    Call it inside the transaction making the change the job is about: the
+    job is then committed (or rolled back) together with it, and costs the
+    request a single INSERT.
+    """
+
+    return Job.objects.create(kind=kind, payload=payload)
+
+
+def enqueue_many(kind, payloads):
+    """ Queue one job of a kind per payload with a single INSERT """
+
+    return Job.objects.bulk_create(
+        Job(kind=kind, payload=payload) for payload in payloads
+    )
+
+
+def claim_jobs(limit, lease):
+    """
+    Lease up to limit due jobs, oldest first, to this worker
+
+    Claiming pushes run_after out by the lease, so other workers skip the
+    jobs until it runs out; jobs of a worker that died are picked up again
+    then. The UPDATE only claims rows that are still due, so two workers
+    racing for the same jobs never both get them.
+    """
+
+    now = timezone.now()
+    token = uuid.uuid4().hex
+
+    with transaction.atomic():
+        job_ids = list(
+            Job.objects.filter(failed=False, run_after__lte=now)
+            .order_by("run_after")
+            .values_list("pk", flat=True)[:limit]
+        )
+        if not job_ids:
+            return []
+
+        Job.objects.filter(pk__in=job_ids, failed=False, run_after__lte=now).update(
+            run_after=now + lease, attempts=F("attempts") + 1, claimed_by=token
+        )
+
+        return list(Job.objects.filter(pk__in=job_ids, claimed_by=token))
+
+
+def run_job(job):
+    """ Run a claimed job, returns the exception it raised or None """
+
+    # worker threads outlive requests, so nothing else recycles their connections
+    close_old_connections()
+    try:
+        # inside a transaction the router reads from the primary, replicas
+        # may not have the rows the job was queued for yet
+        with transaction.atomic():
+            HANDLERS[job.kind](**job.payload)
+    except Exception as error:
+        return error
+
+    return None
+
+
+def run_jobs(jobs, executor=None):
+    """
+    Run claimed jobs, on the executor's threads if one is given
+
+    Jobs that succeeded are deleted with a single DELETE. The others are
+    retried after JOB_RETRY_DELAY seconds, doubled on every attempt, until
+    they have been tried JOB_MAX_ATTEMPTS times and are marked failed.
+    Returns the number of jobs done, retried and failed.
+    """
+
+    errors = list(executor.map(run_job, jobs) if executor else map(run_job, jobs))
+    done = [job.pk for job, error in zip(jobs, errors) if error is None]
+    retried = failed = 0
+
+    now = timezone.now()
+    for job, error in zip(jobs, errors):
+        if error is None:
+            continue
+
+        last_error = f"{type(error).__name__}: {error}"
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            Job.objects.filter(pk=job.pk).update(failed=True, last_error=last_error)
+            failed += 1
+        else:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                run_after=now + timedelta(seconds=delay),
+                last_error=last_error,
+            )
+            retried += 1
+
+    if done:
+        Job.objects.filter(pk__in=done).delete()
+
+    record_job_stats(len(done), retried, failed)
+
+    return len(done), retried, failed
+
+
+def record_job_stats(done, retried, failed):
+    """ Add to the outcome counters, one UPDATE per outcome that happened """
+
+    now = timezone.now()
+    for outcome, count in zip(STATS_OUTCOMES, (done, retried, failed)):
+        if count:
+            updated = JobCounter.objects.filter(outcome=outcome).update(
+                count=F("count") + count, updated_at=now
+            )
+            if not updated:
+                # the migration creates the rows, this covers tables emptied since
+                JobCounter.objects.get_or_create(
+                    outcome=outcome, defaults={"count": count}
+                )
+
+
+def get_job_stats():
+    """
+    Jobs run since the counters started, by outcome, when a worker last
+    finished a batch, and the state of the queue: pending and due jobs
+    (job_pending_idx), the age of the oldest due job in seconds, and the
+    jobs that failed for good
+    """
+
+    counters = {counter.outcome: counter for counter in JobCounter.objects.all()}
+    now = timezone.now()
+    pending = Job.objects.filter(failed=False)
+    oldest = (
+        pending.filter(run_after__lte=now)
+        .order_by("run_after")
+        .values_list("run_after", flat=True)
+        .first()
+    )
+
+    last_batch = max(
+        (counter.updated_at for counter in counters.values()), default=None
+    )
+
+    return {
+        **{
+            outcome: counters[outcome].count if outcome in counters else 0
+            for outcome in STATS_OUTCOMES
+        },
+        "last_batch_at": last_batch,
+        "pending": pending.count(),
+        "due": pending.filter(run_after__lte=now).count(),
+        "oldest_due_seconds": (now - oldest).total_seconds() if oldest else None,
+        "failed_jobs": Job.objects.filter(failed=True).count(),
+    }
+
+
+def notify_outbid(bid_id):
+    """ Email the bidder who held the lead before the bid """
+
+    bid = Bid.objects.select_related("listing").filter(pk=bid_id).first()
+    if bid is None:
+        return
+
+    # the highest bid placed before this one, walking bid_listing_amount_idx
+    previous = (
+        Bid.objects.filter(listing_id=bid.listing_id, pk__lt=bid.pk)
+        .select_related("user")
+        .order_by("-amount")
+        .first()
+    )
+    if previous is None or previous.user_id == bid.user_id or not previous.user.email:
+        return
+
+    send_mail(
+        f"You've been outbid on {bid.listing.title}",
+        f"Someone bid ${bid.amount} on {bid.listing.title}, "
+        f"beating your bid of ${previous.amount}.",
+        None,
+        [previous.user.email],
+    )
+
+
+def notify_winner(listing_id):
+    """ Email the winner of a closed auction """
+
+    listing = (
+        Listing.objects.select_related("winner")
+        .filter(pk=listing_id, closed=True)
+        .first()
+    )
+    if listing is None or listing.winner is None or not listing.winner.email:
+        return
+
+    send_mail(
+        f"You won {listing.title}",
+        f"Your bid of ${listing.current_price} won the auction for {listing.title}.",
+        None,
+        [listing.winner.email],
+    )
+
+
+# job kinds and the functions that run them, called with the job's payload
+HANDLERS = {
+    "notify_outbid": notify_outbid,
+    "notify_winner": notify_winner,
+}
@@ -0,0 +1,94 @@
+""" Concurrency benchmark of the read-only pages under ASGI and WSGI """
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from auctions.models import Listing, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent requests at the read-only pages through the async "
+        "(ASGI) and sync (WSGI) request handlers and compare requests/sec"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=20)
+
+    def handle(self, *args, **options):
+        listing = Listing.objects.filter(closed=False).order_by("-pk").first()
+        if listing is None:
+            raise CommandError("No open listings to benchmark, run seed_data first")
+
+        user, _ = User.objects.get_or_create(username="benchmark")
+        urls = [
+            reverse("index"),
+            reverse("categories"),
+            reverse("category_listings", args=(listing.category_id,)),
+            reverse("get_listing", args=(listing.pk,)),
+            reverse("watchlist"),
+        ]
+
+        setup_test_environment()
+        try:
+            for url in urls:
+                wsgi = self.run_wsgi(url, user, options)
+                asgi = self.run_asgi(url, user, options)
+                self.stdout.write(
+                    f"{url:<32} WSGI {wsgi:>8.1f} req/s   ASGI {asgi:>8.1f} req/s"
+                )
+        finally:
+            teardown_test_environment()
+
+    def run_wsgi(self, url, user, options):
+        """ Requests/sec through the sync handler from a pool of threads """
+
+        client = Client()
+        client.force_login(user)
+
+        def fetch(_):
+            return client.get(url).status_code
+
+        with ThreadPoolExecutor(options["concurrency"]) as pool:
+            started = time.perf_counter()
+            statuses = list(pool.map(fetch, range(options["requests"])))
+            elapsed = time.perf_counter() - started
+
+        self.check_statuses(url, statuses)
+
+        return len(statuses) / elapsed
+
+    def run_asgi(self, url, user, options):
+        """ Requests/sec through the async handler from concurrent tasks """
+
+        client = AsyncClient()
+        client.force_login(user)
+        semaphore = asyncio.Semaphore(options["concurrency"])
+
+        async def fetch():
+            async with semaphore:
+                response = await client.get(url)
+                return response.status_code
+
+        async def run():
+            return await asyncio.gather(*(fetch() for _ in range(options["requests"])))
+
+        started = time.perf_counter()
+        statuses = asyncio.run(run())
+        elapsed = time.perf_counter() - started
+
+        self.check_statuses(url, statuses)
+
+        return len(statuses) / elapsed
+
+    def check_statuses(self, url, statuses):
+        errors = [status for status in statuses if status != 200]
+        if errors:
+            raise CommandError(f"{url} returned {sorted(set(errors))}")
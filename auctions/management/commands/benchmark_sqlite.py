@@ -0,0 +1,141 @@
+""" Concurrent bid-write and browse-read benchmark of the SQLite settings """
+
+import decimal
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from auctions.bidding import BidError, place_bid
+from auctions.management.commands.benchmark_views import percentile
+from auctions.models import Listing, User
+
+# SQLite's own defaults, rollback journal and full fsync
+BASELINE_PRAGMAS = {"journal_mode": "delete", "synchronous": "full"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent bidders and browsers against the database, first with "
+        "SQLite's default rollback journal, then with SQLITE_PRAGMAS, and "
+        "compare throughput, latency and 'database is locked' errors. "
+        "Places real bids, run it on a seeded copy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=5)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The default database isn't SQLite")
+
+        listings = list(Listing.objects.filter(closed=False).values_list("pk", "user"))
+        bidders = list(User.objects.values_list("pk", flat=True)[:100])
+        if not listings or len(bidders) < 2:
+            raise CommandError("No open listings to bid on, run seed_data first")
+        self.listings = listings
+        self.bidders = User.objects.in_bulk(bidders)
+
+        setup_test_environment()
+        try:
+            for label, pragmas in (
+                ("rollback journal", BASELINE_PRAGMAS),
+                ("SQLITE_PRAGMAS", settings.SQLITE_PRAGMAS),
+            ):
+                # new connections pick up the PRAGMAs under test
+                connections.close_all()
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    self.report(label, self.run(options))
+        finally:
+            connections.close_all()
+            teardown_test_environment()
+
+    def run(self, options):
+        deadline = time.perf_counter() + options["seconds"]
+        results = {"writes": [], "reads": [], "rejected": 0, "locked": 0}
+        lock = threading.Lock()
+
+        def writer():
+            latencies, rejected, locked = [], 0, 0
+            try:
+                while time.perf_counter() < deadline:
+                    listing_id, seller_id = random.choice(self.listings)
+                    user = self.bidders[
+                        random.choice([pk for pk in self.bidders if pk != seller_id])
+                    ]
+                    listing = Listing.objects.only("current_price").get(pk=listing_id)
+                    amount = listing.current_price + decimal.Decimal("0.01")
+
+                    started = time.perf_counter()
+                    try:
+                        place_bid(listing, user, amount)
+                        latencies.append(time.perf_counter() - started)
+                    except BidError:
+                        rejected += 1
+                    except OperationalError:
+                        locked += 1
+            finally:
+                connection.close()
+                with lock:
+                    results["writes"] += latencies
+                    results["rejected"] += rejected
+                    results["locked"] += locked
+
+        def reader():
+            client = Client()
+            latencies, locked = [], 0
+            try:
+                while time.perf_counter() < deadline:
+                    listing_id, _ = random.choice(self.listings)
+                    url = random.choice(
+                        [reverse("index"), reverse("get_listing", args=(listing_id,))]
+                    )
+                    started = time.perf_counter()
+                    try:
+                        client.get(url)
+                        latencies.append(time.perf_counter() - started)
+                    except OperationalError:
+                        locked += 1
+            finally:
+                connection.close()
+                with lock:
+                    results["reads"] += latencies
+                    results["locked"] += locked
+
+        threads = [threading.Thread(target=writer) for _ in range(options["writers"])]
+        threads += [threading.Thread(target=reader) for _ in range(options["readers"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results["elapsed"] = time.perf_counter() - started
+
+        return results
+
+    def report(self, label, results):
+        elapsed = results["elapsed"]
+        line = [f"{label:<18}"]
+        for kind in ("writes", "reads"):
+            latencies = results[kind] or [0]
+            line.append(
+                f"{kind} {len(results[kind]) / elapsed:>7.1f}/s "
+                f"(p50 {statistics.median(latencies) * 1000:.1f} ms, "
+                f"p95 {percentile(latencies, 95) * 1000:.1f} ms)"
+            )
+        line.append(f"outbid {results['rejected']}, locked {results['locked']}")
+
+        self.stdout.write("   ".join(line))
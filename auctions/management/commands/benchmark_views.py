@@ -0,0 +1,199 @@
+""" Per-view latency and query-count benchmark with checked-in budgets """
+
+import json
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import URLPattern, reverse
+
+from auctions import urls
+from auctions.models import Category, Listing, User, Watchlist
+
+BUDGETS_PATH = os.path.join(os.path.dirname(urls.__file__), "benchmark_budgets.json")
+
+# extra GET parameters for routes that need them to do real work
+QUERY_PARAMS = {
+    "search": {"q": "vintage"},
+}
+
+# staff-only routes, requested as a staff user so the view itself is timed
+STAFF_ROUTES = {
+    "export_listings",
+    "export_bids",
+    "cache_stats",
+    "job_stats",
+    "rate_limit_stats",
+}
+
+# routes that only accept POST, with their form data
+POST_DATA = {
+    "update_watchlist": lambda listing: {"action": "watch", "listing_id": listing.pk},
+}
+
+# untimed state resets so that every timed request of a route does the same work
+SETUP = {
+    "add_to_watchlist": lambda user, listing: Watchlist.objects.filter(
+        user=user, listing=listing
+    ).update(deleted=True),
+    "remove_from_watchlist": lambda user, listing: Watchlist.objects.update_or_create(
+        user=user, listing=listing, defaults={"deleted": False}
+    ),
+    "update_watchlist": lambda user, listing: Watchlist.objects.filter(
+        user=user, listing=listing
+    ).update(deleted=True),
+}
+
+
+def percentile(samples, percent):
+    """ Nearest-rank percentile of a non-empty list of samples """
+
+    ordered = sorted(samples)
+    rank = max(int(round(percent / 100 * len(ordered))) - 1, 0)
+
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def get_routes():
+    """ Every named route in auctions/urls.py, once per name """
+
+    routes = {}
+    for pattern in urls.urlpatterns:
+        if isinstance(pattern, URLPattern) and pattern.name not in routes:
+            routes[pattern.name] = list(pattern.pattern.converters)
+
+    return routes
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every route in auctions/urls.py through the test client, report "
+        "latency percentiles and query counts, and fail on budget overruns"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--budgets", default=BUDGETS_PATH)
+        parser.add_argument(
+            "--no-fail", action="store_true", help="Report only, never fail"
+        )
+
+    def handle(self, *args, **options):
+        with open(options["budgets"]) as budgets_file:
+            budgets = json.load(budgets_file)
+
+        listing = Listing.objects.filter(closed=False).order_by("-pk").first()
+        category = Category.objects.filter(listings__closed=False).first()
+        if listing is None or category is None:
+            raise CommandError("No open listings to benchmark, run seed_data first")
+
+        user, _ = User.objects.get_or_create(username="benchmark")
+        staff, _ = User.objects.get_or_create(
+            username="benchmark_staff", defaults={"is_staff": True}
+        )
+        arguments = {"listing_id": listing.pk, "category_id": category.pk}
+        self.listing = listing
+
+        setup_test_environment()
+        try:
+            results = {
+                name: self.benchmark(
+                    name,
+                    params,
+                    arguments,
+                    staff if name in STAFF_ROUTES else user,
+                    options["requests"],
+                )
+                for name, params in get_routes().items()
+            }
+        finally:
+            teardown_test_environment()
+
+        failures = self.report(results, budgets)
+        if failures and not options["no_fail"]:
+            raise CommandError("Over budget: " + "; ".join(failures))
+
+    def benchmark(self, name, params, arguments, user, requests):
+        """
+        Time repeated requests of one route as a logged in user
+
+        Streaming responses are timed up to their first chunk, the stream's
+        setup and first batch, rather than to the end of an unbounded feed.
+        """
+
+        missing = [param for param in params if param not in arguments]
+        if missing:
+            raise CommandError(f"No sample value for {', '.join(missing)} in {name}")
+
+        url = reverse(name, kwargs={param: arguments[param] for param in params})
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        timings, query_counts, statuses = [], [], set()
+
+        for _ in range(requests):
+            if name in SETUP:
+                SETUP[name](user, self.listing)
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                if name in POST_DATA:
+                    response = client.post(url, POST_DATA[name](self.listing))
+                else:
+                    response = client.get(url, QUERY_PARAMS.get(name, {}))
+                if response.streaming:
+                    next(iter(response.streaming_content), b"")
+                timings.append((time.perf_counter() - started) * 1000)
+            query_counts.append(len(queries))
+            response.close()
+            statuses.add(response.status_code)
+
+            # logging out (or a redirect to login) must not change later runs
+            client.force_login(user)
+
+        return {
+            "p50_ms": statistics.median(timings),
+            "p95_ms": percentile(timings, 95),
+            "p99_ms": percentile(timings, 99),
+            "queries": max(query_counts),
+            "statuses": sorted(statuses),
+        }
+
+    def report(self, results, budgets):
+        """ Print the results table and return the budget violations """
+
+        failures = []
+        self.stdout.write(
+            f"{'route':<24}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'queries':>9}  status"
+        )
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<24}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+                f"{result['p99_ms']:>9.1f}{result['queries']:>9}  "
+                f"{','.join(map(str, result['statuses']))}"
+            )
+
+            budget = budgets.get(name)
+            if budget is None:
+                failures.append(f"{name} has no budget in {BUDGETS_PATH}")
+                continue
+
+            for metric in ("p95_ms", "queries"):
+                if result[metric] > budget[metric]:
+                    failures.append(
+                        f"{name} {metric} {result[metric]:.1f} > {budget[metric]}"
+                    )
+
+            if any(status >= 500 for status in result["statuses"]):
+                failures.append(f"{name} returned a server error")
+
+        return failures
@@ -0,0 +1,63 @@
+""" Close timed auctions whose end time has passed """
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from auctions.bidding import close_listings, get_expired_listing_ids
+from auctions.jobs import enqueue_many
+from auctions.models import Listing
+
+
+class Command(BaseCommand):
+    help = (
+        "Close every open listing whose ends_at has passed, recording the high "
+        "bidder as the winner, in batches of set-based updates. Runs in its "
+        "own process: open listing pages reload themselves at ends_at rather "
+        "than getting a close event, and the categories cache moves on by "
+        "itself (caching.active_categories_key)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--every",
+            type=float,
+            help="Keep running, sweeping again after this many seconds",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.sweep(options["batch_size"])
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
+
+    def sweep(self, batch_size):
+        started = time.perf_counter()
+        now = timezone.now()
+        closed = 0
+
+        while True:
+            with transaction.atomic():
+                listing_ids = get_expired_listing_ids(now, batch_size)
+                if not listing_ids:
+                    break
+                closed += close_listings(
+                    Listing.objects.filter(pk__in=listing_ids), now
+                )
+                # closed_at tells the listings of this sweep from any the
+                # sellers closed meanwhile, who have their jobs queued already
+                won = Listing.objects.filter(
+                    pk__in=listing_ids, closed_at=now, winner__isnull=False
+                ).values_list("pk", flat=True)
+                enqueue_many("notify_winner", [{"listing_id": pk} for pk in won])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Closed {closed} expired listings "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+        )
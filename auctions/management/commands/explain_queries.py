@@ -0,0 +1,82 @@
+""" Check that the hot view queries are served from indexes """
+
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from auctions.models import Bid, Comment, Listing, Watchlist
+from auctions.pagination import keyset_filter
+
+# a step that reads an index or table from one end rather than seeking into
+# it: sqlite's "SCAN <table> [USING INDEX ...]" (a seek is reported as
+# "SEARCH <table> USING INDEX ... (col=?)"), postgres' "Seq Scan on" or an
+# "Index Scan" with no "Index Cond"
+SCAN_PATTERNS = [
+    re.compile(r"\bSCAN\b"),
+    re.compile(r"\bSeq Scan on\b"),
+    re.compile(r"\bIndex (Only )?Scan\b(?![\s\S]*\bIndex Cond\b)"),
+]
+
+# first pages walk the ordering index and stop at their LIMIT, so these may
+# scan; every other query has a predicate the index must seek on
+ORDERED_SCANS = {"open listings"}
+
+
+def unseeked(plan):
+    return any(pattern.search(plan) for pattern in SCAN_PATTERNS)
+
+
+def hot_queries():
+    """
+    The query shapes issued by the list, detail and navbar code paths, and
+    by the expired auction sweeper
+    """
+
+    listing = Listing(pk=1, category_id=1, created_at=timezone.now())
+    open_listings = Listing.objects.filter(closed=False).order_by("-created_at", "-pk")
+    listing_bids = Bid.objects.filter(listing_id=listing.pk)
+
+    return {
+        "open listings": open_listings[:26],
+        "open listings, next page": open_listings.filter(
+            keyset_filter(
+                [("created_at", True), ("pk", True)],
+                [listing.created_at, listing.pk],
+                True,
+            )
+        )[:26],
+        "open listings by category": open_listings.filter(
+            category_id=listing.category_id
+        )[:26],
+        "highest bid": listing_bids.order_by("-amount")[:1],
+        "listing comments": Comment.objects.filter(listing_id=listing.pk)
+        .select_related("user")
+        .order_by("created_at", "pk")[:21],
+        "watchlist count": Watchlist.objects.filter(user_id=1, deleted=False),
+        "expired listings": Listing.objects.filter(
+            closed=False, ends_at__lte=listing.created_at
+        ).order_by("ends_at")[:500],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot view queries and fail if any scans a table or index "
+        "instead of seeking into it"
+    )
+
+    def handle(self, *args, **options):
+        failures = []
+
+        for name, queryset in hot_queries().items():
+            plan = queryset.explain()
+            self.stdout.write(f"{name}:\n{plan}\n")
+
+            if name not in ORDERED_SCANS and unseeked(plan):
+                failures.append(name)
+
+        if failures:
+            raise CommandError(f"Scan without a seek in: {', '.join(failures)}")
+
+        self.stdout.write(self.style.SUCCESS("All hot queries seek an index"))
@@ -0,0 +1,55 @@
+""" Bulk-import listings for a seller from a CSV or JSON Lines file """
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.imports import FORMATS, ListingImporter, read_rows
+from auctions.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Import listings from a CSV file (with a header row) or a JSON Lines "
+        "file, with title, description, category, starting_bid and image_url "
+        "columns. Categories are created as needed, invalid rows are reported "
+        "and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--user", required=True, help="Username of the seller")
+        parser.add_argument(
+            "--format", choices=FORMATS, help="Defaults to the file extension"
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']}")
+
+        file_format = options["format"]
+        if file_format is None:
+            file_format = os.path.splitext(options["path"])[1].lstrip(".").lower()
+            if file_format not in FORMATS:
+                raise CommandError("Can't tell the file format, pass --format")
+
+        importer = ListingImporter(user, batch_size=options["batch_size"])
+        try:
+            with open(options["path"], newline="", encoding="utf-8-sig") as lines:
+                rate = importer.run(read_rows(lines, file_format))
+        except OSError as error:
+            raise CommandError(error)
+
+        for line_number, message in importer.errors:
+            self.stderr.write(f"line {line_number}: {message}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {importer.imported} listings "
+                f"({importer.categories.created} new categories), "
+                f"skipped {len(importer.errors)} rows, {rate:.0f} rows/sec"
+            )
+        )
@@ -0,0 +1,40 @@
+""" Rebuild the denormalized bid summary stored on each Listing """
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Now
+
+from auctions.models import Bid, Listing
+
+
+class Command(BaseCommand):
+    help = "Recompute current_price, bid_count and high_bidder for every listing"
+
+    def handle(self, *args, **options):
+        listing_bids = Bid.objects.filter(listing=OuterRef("pk"))
+        highest_bids = listing_bids.order_by("-amount", "pk")
+        bid_counts = (
+            listing_bids.order_by()
+            .values("listing")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+
+        with transaction.atomic():
+            updated = Listing.objects.update(
+                current_price=Coalesce(
+                    Subquery(highest_bids.values("amount")[:1]),
+                    F("starting_bid"),
+                    Value(0),
+                    output_field=DecimalField(max_digits=6, decimal_places=2),
+                ),
+                bid_count=Coalesce(Subquery(bid_counts), Value(0)),
+                high_bidder=Subquery(highest_bids.values("user")[:1]),
+                version=F("version") + 1,
+                updated_at=Now(),
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt bid summaries for {updated} listings")
+        )
@@ -0,0 +1,65 @@
+""" Run queued background jobs """
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from auctions.jobs import claim_jobs, run_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Claim due jobs in batches and run them on a pool of threads, retrying "
+        "failures with backoff, and report throughput per batch. Runs until "
+        "stopped, or until no job is due with --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument(
+            "--lease",
+            type=float,
+            default=300,
+            help="Seconds before jobs of a worker that died are run again",
+        )
+        parser.add_argument(
+            "--poll", type=float, default=1, help="Seconds to wait when idle"
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit when no job is due"
+        )
+
+    def handle(self, *args, **options):
+        lease = timedelta(seconds=options["lease"])
+        totals = [0, 0, 0]
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(options["threads"]) as executor:
+            while True:
+                jobs = claim_jobs(options["batch_size"], lease)
+                if not jobs:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+
+                batch_started = time.perf_counter()
+                outcome = run_jobs(jobs, executor)
+                totals = [total + count for total, count in zip(totals, outcome)]
+                self.report(len(jobs), outcome, time.perf_counter() - batch_started)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ran {sum(totals)} jobs in {time.perf_counter() - started:.2f}s: "
+                "{} done, {} retried, {} failed".format(*totals)
+            )
+        )
+
+    def report(self, count, outcome, elapsed):
+        self.stdout.write(
+            f"{count} jobs in {elapsed:.2f}s ({count / elapsed:.0f} jobs/s): "
+            "{} done, {} retried, {} failed".format(*outcome)
+        )
@@ -0,0 +1,144 @@
+""" Bulk-load synthetic users, listings, bids, comments and watchlist rows """
+
+import decimal
+import random
+import secrets
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from auctions.models import Bid, Category, Comment, Listing, User, Watchlist
+
+WORDS = (
+    "vintage antique modern rare classic signed boxed mint used restored "
+    "bicycle camera guitar lamp chair table watch painting record book "
+    "jacket radio clock vase rug poster keyboard console typewriter"
+).split()
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+class Command(BaseCommand):
+    help = "Seed the database with synthetic auction data in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--categories", type=int, default=10)
+        parser.add_argument("--listings", type=int, default=1000)
+        parser.add_argument("--bids", type=int, default=10000)
+        parser.add_argument("--comments", type=int, default=2000)
+        parser.add_argument("--watchlist", type=int, default=2000)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--seed", type=int, help="Random seed for repeatable data")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        run = secrets.token_hex(3)
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            password = make_password("password")
+            User.objects.bulk_create(
+                [
+                    User(username=f"seed-{run}-{i}", password=password)
+                    for i in range(options["users"])
+                ],
+                batch_size=batch_size,
+            )
+            user_ids = list(
+                User.objects.filter(username__startswith=f"seed-{run}-").values_list(
+                    "pk", flat=True
+                )
+            )
+
+            Category.objects.bulk_create(
+                [
+                    Category(title=f"{rng.choice(WORDS).title()} {run}-{i}")
+                    for i in range(options["categories"])
+                ]
+            )
+            category_ids = list(
+                Category.objects.filter(title__contains=f" {run}-").values_list(
+                    "pk", flat=True
+                )
+            )
+
+            last_listing_id = Listing.objects.aggregate(last=Max("pk"))["last"] or 0
+            listings = []
+            for _ in range(options["listings"]):
+                starting_bid = decimal.Decimal(rng.randint(100, 10000)) / 100
+                listings.append(
+                    Listing(
+                        title=sentence(rng, 3).title(),
+                        description=sentence(rng, 20),
+                        user_id=rng.choice(user_ids),
+                        category_id=rng.choice(category_ids),
+                        starting_bid=starting_bid,
+                        current_price=starting_bid,
+                        closed=rng.random() < 0.1,
+                    )
+                )
+            Listing.objects.bulk_create(listings, batch_size=batch_size)
+            listings = list(
+                Listing.objects.filter(pk__gt=last_listing_id).values_list(
+                    "pk", "user_id", "current_price"
+                )
+            )
+
+            prices = {pk: price for pk, _, price in listings}
+            bids = []
+            for _ in range(options["bids"] if listings else 0):
+                listing_id, seller_id, _ = rng.choice(listings)
+                bidder_id = rng.choice(user_ids)
+                if bidder_id == seller_id:
+                    continue
+                prices[listing_id] += decimal.Decimal(rng.randint(1, 500)) / 100
+                if prices[listing_id] >= 10000:
+                    continue
+                bids.append(
+                    Bid(
+                        amount=prices[listing_id],
+                        listing_id=listing_id,
+                        user_id=bidder_id,
+                    )
+                )
+            Bid.objects.bulk_create(bids, batch_size=batch_size)
+
+            comments = [
+                Comment(
+                    body=sentence(rng, 12),
+                    listing_id=rng.choice(listings)[0],
+                    user_id=rng.choice(user_ids),
+                )
+                for _ in range(options["comments"] if listings else 0)
+            ]
+            Comment.objects.bulk_create(comments, batch_size=batch_size)
+
+            watched = set()
+            for _ in range(options["watchlist"] if listings else 0):
+                watched.add((rng.choice(user_ids), rng.choice(listings)[0]))
+            Watchlist.objects.bulk_create(
+                [
+                    Watchlist(user_id=user_id, listing_id=listing_id)
+                    for user_id, listing_id in watched
+                ],
+                batch_size=batch_size,
+            )
+
+            call_command("rebuild_bid_summaries", stdout=self.stdout)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {len(user_ids)} users, {len(category_ids)} categories, "
+                f"{len(listings)} listings, {len(bids)} bids, "
+                f"{len(comments)} comments and {len(watched)} watchlist rows "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+        )
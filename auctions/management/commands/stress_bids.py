@@ -0,0 +1,116 @@
+""" Multi-threaded bidding stress test for the bid placement engine """
+
+import decimal
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from auctions.bidding import BidError, place_bid
+from auctions.models import Category, Listing, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer a single listing with concurrent bidders, then check that the "
+        "accepted bids are strictly increasing and the listing summary matches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--bids-per-thread", type=int, default=50)
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the stress listing afterwards"
+        )
+
+    def handle(self, *args, **options):
+        seller, _ = User.objects.get_or_create(username="stress-seller")
+        category, _ = Category.objects.get_or_create(title="Stress Test")
+        bidders = [
+            User.objects.get_or_create(username=f"stress-bidder-{i}")[0]
+            for i in range(options["threads"])
+        ]
+        listing = Listing.objects.create(
+            title="Stress test listing",
+            description="Created by the stress_bids management command",
+            user=seller,
+            category=category,
+            starting_bid=decimal.Decimal("1.00"),
+        )
+
+        results = {"accepted": 0, "rejected": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def bidder(user):
+            counts = {"accepted": 0, "rejected": 0, "errors": 0}
+            try:
+                for _ in range(options["bids_per_thread"]):
+                    current_price = Listing.objects.values_list(
+                        "current_price", flat=True
+                    ).get(pk=listing.pk)
+                    amount = (
+                        current_price + decimal.Decimal(random.randint(1, 100)) / 100
+                    )
+                    try:
+                        place_bid(listing, user, amount)
+                        counts["accepted"] += 1
+                    except BidError:
+                        counts["rejected"] += 1
+                    except OperationalError:
+                        counts["errors"] += 1
+            finally:
+                connection.close()
+                with lock:
+                    for key, value in counts.items():
+                        results[key] += value
+
+        threads = [threading.Thread(target=bidder, args=(user,)) for user in bidders]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            self.check_listing(listing, results["accepted"])
+        finally:
+            if not options["keep"]:
+                listing.delete()
+
+        attempts = sum(results.values())
+        self.stdout.write(
+            f"{attempts} attempts from {len(threads)} threads in {elapsed:.2f}s: "
+            f"{results['accepted']} accepted, {results['rejected']} rejected as stale, "
+            f"{results['errors']} database errors"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{results['accepted'] / elapsed:.1f} bids/sec accepted, "
+                f"{attempts / elapsed:.1f} attempts/sec"
+            )
+        )
+
+    def check_listing(self, listing, accepted):
+        """ Verify bid ordering and the denormalized summary """
+
+        listing.refresh_from_db()
+        bids = list(listing.bids.order_by("pk").values_list("amount", "user_id"))
+
+        if len(bids) != accepted or listing.bid_count != accepted:
+            raise CommandError(
+                f"Expected {accepted} bids, found {len(bids)} rows and "
+                f"bid_count={listing.bid_count}"
+            )
+
+        for (previous, _), (amount, _) in zip(bids, bids[1:]):
+            if amount <= previous:
+                raise CommandError(f"Bid of {amount} was accepted after {previous}")
+
+        if bids and (listing.current_price, listing.high_bidder_id) != bids[-1]:
+            raise CommandError(
+                f"Listing shows {listing.current_price} by user "
+                f"{listing.high_bidder_id}, highest bid is {bids[-1]}"
+            )
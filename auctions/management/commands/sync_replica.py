@@ -0,0 +1,57 @@
+""" Refresh SQLite read replicas from the primary database """
+
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database over every replica in "
+        "DATABASE_REPLICAS with SQLite's online backup, to run the replica "
+        "router locally. With --every it keeps copying, which doubles as "
+        "replication lag."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--every",
+            type=float,
+            help="Keep running, copying again after this many seconds",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No DATABASE_REPLICAS configured")
+
+        aliases = [DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS]
+        for alias in aliases:
+            if settings.DATABASES[alias]["ENGINE"] != "django.db.backends.sqlite3":
+                raise CommandError(f"{alias} isn't a SQLite database")
+
+        while True:
+            self.sync()
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
+
+    def sync(self):
+        started = time.perf_counter()
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]["NAME"]
+
+        with closing(sqlite3.connect(primary)) as source:
+            for alias in settings.DATABASE_REPLICAS:
+                replica = settings.DATABASES[alias]["NAME"]
+                with closing(sqlite3.connect(replica)) as target:
+                    source.backup(target)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Copied {primary} to {len(settings.DATABASE_REPLICAS)} replicas "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+        )
@@ -0,0 +1,251 @@
+""" Middleware """
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+from django.utils.decorators import sync_and_async_middleware
+
+from .routers import RoutingState, current_state
+
+logger = logging.getLogger("auctions.instrumentation")
+
+# set on responses to requests that wrote, pins the browser to the primary
+REPLICA_PIN_COOKIE = "primary_pin"
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# the per-request recorder, if instrumentation is active for this request
+current_recorder = contextvars.ContextVar("current_recorder", default=None)
+
+IN_CLAUSE = re.compile(r"IN \((%s, )*%s\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+def sql_shape(sql):
+    """ Normalize a statement so repeats with different parameters compare equal """
+
+    return WHITESPACE.sub(" ", IN_CLAUSE.sub("IN (...)", sql)).strip()
+
+
+class RequestRecorder:
+    """ Collects query and template timings for a single request """
+
+    def __init__(self):
+        self.queries = []
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries.append((duration, context["connection"].alias, sql))
+
+    @property
+    def db_time(self):
+        return sum(duration for duration, _, _ in self.queries)
+
+    def slowest(self, count):
+        return sorted(self.queries, key=lambda query: query[0], reverse=True)[:count]
+
+    def repeated_shapes(self, threshold):
+        shapes = Counter(sql_shape(sql) for _, _, sql in self.queries)
+
+        return {shape: seen for shape, seen in shapes.items() if seen > threshold}
+
+
+def instrumented_render(render):
+    """ Wrap Template.render to time the outermost render of each request """
+
+    def wrapper(self, context):
+        recorder = current_recorder.get()
+        if recorder is None:
+            return render(self, context)
+
+        recorder.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            recorder.template_depth -= 1
+            if not recorder.template_depth:
+                recorder.template_time += time.perf_counter() - started
+
+    wrapper.instrumented = True
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def recording_queries():
+    """
+    Record the queries of this thread's connections in the request's
+    recorder, if the request is instrumented
+
+    The middleware does it for its own thread. Parts of a request run on
+    other threads (async_views.read_only) do it there, the recorder follows
+    the request's context into them.
+    """
+
+    recorder = current_recorder.get()
+    with contextlib.ExitStack() as stack:
+        if recorder is not None:
+            for connection in connections.all():
+                if recorder not in connection.execute_wrappers:
+                    stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Opt-in per-request instrumentation, enabled with QUERY_INSTRUMENTATION
+
+    Records the query count, DB time, template render time and the slowest
+    statements of each request, reports them in a Server-Timing header and a
+    JSON log line on the auctions.instrumentation logger, and logs a warning
+    when one SQL shape repeats more than QUERY_INSTRUMENTATION_N_PLUS_ONE
+    times (a likely N+1 pattern).
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.slowest_count = settings.QUERY_INSTRUMENTATION_SLOWEST
+        self.n_plus_one_threshold = settings.QUERY_INSTRUMENTATION_N_PLUS_ONE
+
+        if not getattr(Template.render, "instrumented", False):
+            Template.render = instrumented_render(Template.render)
+
+    def __call__(self, request):
+        recorder = RequestRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+
+        try:
+            with recording_queries():
+                response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+
+        total_time = time.perf_counter() - started
+        self.report(request, response, recorder, total_time)
+
+        return response
+
+    def report(self, request, response, recorder, total_time):
+        """ Attach the Server-Timing header and write the log lines """
+
+        query_count = len(recorder.queries)
+        db_ms = recorder.db_time * 1000
+        template_ms = recorder.template_time * 1000
+        total_ms = total_time * 1000
+
+        response["Server-Timing"] = (
+            f'db;dur={db_ms:.1f};desc="{query_count} queries", '
+            f"tpl;dur={template_ms:.1f}, total;dur={total_ms:.1f}"
+        )
+
+        repeated = recorder.repeated_shapes(self.n_plus_one_threshold)
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "queries": query_count,
+                    "db_ms": round(db_ms, 1),
+                    "template_ms": round(template_ms, 1),
+                    "total_ms": round(total_ms, 1),
+                    "slowest": [
+                        {"ms": round(duration * 1000, 1), "db": alias, "sql": sql}
+                        for duration, alias, sql in recorder.slowest(self.slowest_count)
+                    ],
+                    "repeated": repeated,
+                }
+            )
+        )
+
+        for shape, seen in repeated.items():
+            logger.warning(
+                "Possible N+1 on %s %s: %d executions of %s",
+                request.method,
+                request.path,
+                seen,
+                shape,
+            )
+
+
+class ReplicaPinMiddleware:
+    """
+    Read-your-own-writes on top of auctions.routers.ReplicaRouter
+
+    Unsafe requests read from the primary throughout. A request that writes
+    gets a cookie that keeps the browser's requests on the primary for
+    REPLICA_PIN_SECONDS, longer than replicas are expected to lag, so a
+    bidder sees their own bid (and the rest of their changes) straight away.
+    Unused without DATABASE_REPLICAS.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(
+            pinned=request.method not in SAFE_METHODS
+            or REPLICA_PIN_COOKIE in request.COOKIES
+        )
+        token = current_state.set(state)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            current_state.reset(token)
+
+        if state.wrote:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+
+        return response
+
+
+@sync_and_async_middleware
+def asgi_urlconf_middleware(get_response):
+    """
+    Route requests handled by an async middleware chain (i.e. under ASGI)
+    through settings.ASGI_URLCONF, which serves async read-only views
+    """
+
+    if asyncio.iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            request.urlconf = settings.ASGI_URLCONF
+            return await get_response(request)
+
+    else:
+
+        def middleware(request):
+            return get_response(request)
+
+    return middleware
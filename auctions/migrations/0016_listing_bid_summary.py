@@ -0,0 +1,55 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Coalesce
+
+
+def backfill_bid_summaries(apps, schema_editor):
+    # the same subqueries as the rebuild_bid_summaries command
+    Bid = apps.get_model('auctions', 'Bid')
+    Listing = apps.get_model('auctions', 'Listing')
+    listing_bids = Bid.objects.filter(listing=models.OuterRef('pk'))
+    highest_bids = listing_bids.order_by('-amount', 'pk')
+    bid_counts = (
+        listing_bids.order_by()
+        .values('listing')
+        .annotate(count=models.Count('pk'))
+        .values('count')
+    )
+    Listing.objects.update(
+        current_price=Coalesce(
+            models.Subquery(highest_bids.values('amount')[:1]),
+            models.F('starting_bid'),
+            models.Value(0),
+            output_field=models.DecimalField(max_digits=6, decimal_places=2),
+        ),
+        bid_count=Coalesce(models.Subquery(bid_counts), models.Value(0)),
+        high_bidder=models.Subquery(highest_bids.values('user')[:1]),
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0015_auto_20201224_1954'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='current_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=6, verbose_name='Current Price'),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='high_bidder',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leading_listings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_bid_summaries, migrations.RunPython.noop),
+    ]
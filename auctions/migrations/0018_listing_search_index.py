@@ -0,0 +1,43 @@
+# Full-text search index over open listings (SQLite FTS5)
+#
+# The triggers that keep the index in sync are installed by
+# auctions.search.install_search_triggers after every migrate, because
+# SQLite table rebuilds in later migrations drop triggers on auctions_listing;
+# it drops them instead when migrating back before this migration.
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # other databases fall back to a LIKE search, see auctions.search
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE auctions_listing_fts USING fts5("
+        "title, description, content='auctions_listing', content_rowid='id')"
+    )
+    schema_editor.execute(
+        "INSERT INTO auctions_listing_fts (rowid, title, description) "
+        "SELECT id, title, description FROM auctions_listing WHERE NOT closed"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    for trigger in ("insert", "delete", "update"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS auctions_listing_fts_{trigger}")
+    schema_editor.execute("DROP TABLE IF EXISTS auctions_listing_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0017_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
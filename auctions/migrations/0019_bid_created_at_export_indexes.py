@@ -0,0 +1,28 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0018_listing_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bid',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['created_at', 'id'], name='bid_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['created_at', 'id'], name='listing_created_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def record_winners(apps, schema_editor):
+    # auctions closed so far were won by whoever held the high bid
+    Listing = apps.get_model('auctions', 'Listing')
+    Listing.objects.filter(closed=True).update(winner=models.F('high_bidder'))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0019_bid_created_at_export_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Ends At'),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='winner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='won_auctions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(closed=False), fields=['ends_at'], name='listing_open_expiry_idx'),
+        ),
+        migrations.RunPython(record_winners, migrations.RunPython.noop),
+    ]
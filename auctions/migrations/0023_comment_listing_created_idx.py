@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0022_listing_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['listing', 'created_at', 'id'], name='comment_listing_created_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.1.14 on 2026-10-18 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0023_comment_listing_created_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='watchlist',
+            name='watchlist_user_deleted_idx',
+        ),
+        migrations.AddIndex(
+            model_name='watchlist',
+            index=models.Index(condition=models.Q(deleted=False), fields=['user', 'listing'], name='watchlist_user_active_idx'),
+        ),
+    ]
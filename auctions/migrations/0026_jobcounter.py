@@ -0,0 +1,30 @@
+# Generated by Django 3.1.14 on 2026-10-18 13:23
+
+from django.db import migrations, models
+
+
+def create_counters(apps, schema_editor):
+    # the workers only ever increment existing rows
+    JobCounter = apps.get_model('auctions', 'JobCounter')
+    JobCounter.objects.bulk_create(
+        JobCounter(outcome=outcome) for outcome in ('done', 'retried', 'failed')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0025_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCounter',
+            fields=[
+                ('outcome', models.CharField(max_length=16, primary_key=True, serialize=False)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0026_jobcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(closed_at__isnull=False), fields=['closed_at'], name='listing_closed_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -14,6 +15,18 @@ class Category(models.Model):
         return f"{self.title}"
 
 
+# Listing columns written only by the conditional UPDATEs of auctions.bidding
+BID_STATE_FIELDS = {
+    "current_price",
+    "bid_count",
+    "high_bidder",
+    "closed",
+    "closed_at",
+    "winner",
+    "version",
+}
+
+
 class Listing(models.Model):
     title = models.CharField(max_length=64)
     description = models.TextField()
@@ -35,21 +48,145 @@ class Listing(models.Model):
     closed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # timed auctions are closed by the close_expired_listings sweeper, the
+    # others only when the seller closes them
+    ends_at = models.DateTimeField(verbose_name="Ends At", null=True, blank=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    winner = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name="won_auctions",
+        null=True,
+        blank=True,
+    )
+
+    # denormalized bid summary, kept up to date when a bid is placed
+    current_price = models.DecimalField(
+        max_digits=6, decimal_places=2, verbose_name="Current Price", default=0
+    )
+    bid_count = models.PositiveIntegerField(default=0)
+    high_bidder = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name="leading_listings",
+        null=True,
+        blank=True,
+    )
+
+    # bumped on every bid, close and edit, cached renderings are keyed on it
+    version = models.PositiveIntegerField(default=1)
+    # also moved on by comments, conditional GETs compare against it
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="listing_open_recent_idx",
+                condition=models.Q(closed=False),
+            ),
+            models.Index(
+                fields=["category", "-created_at", "-id"],
+                name="listing_open_category_idx",
+                condition=models.Q(closed=False),
+            ),
+            models.Index(fields=["created_at", "id"], name="listing_created_idx"),
+            models.Index(
+                fields=["ends_at"],
+                name="listing_open_expiry_idx",
+                condition=models.Q(closed=False),
+            ),
+            models.Index(
+                fields=["closed_at"],
+                name="listing_closed_idx",
+                condition=models.Q(closed_at__isnull=False),
+            ),
+            models.Index(fields=["updated_at"], name="listing_updated_idx"),
+            models.Index(
+                fields=["category", "updated_at"], name="listing_category_updated_idx"
+            ),
+        ]
+
     def __str__(self):
 
         return f"{self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        listing = super().from_db(db, field_names, values)
+        listing._loaded_bid_state = listing.bid_state()
+        return listing
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        refreshed = self.bid_state()
+        if fields is not None:
+            attnames = {self._meta.get_field(name).attname for name in fields}
+            refreshed = {
+                name: value for name, value in refreshed.items() if name in attnames
+            }
+        self._loaded_bid_state = {**getattr(self, "_loaded_bid_state", {}), **refreshed}
+
+    def bid_state(self):
+        """ The bid state fields that are loaded, by attname """
+
+        return {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.name in BID_STATE_FIELDS and field.attname in self.__dict__
+        }
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # a new listing is priced at its starting bid until someone bids
+            if not self.bid_count:
+                self.current_price = self.starting_bid or 0
+            super().save(*args, **kwargs)
+            self._loaded_bid_state = self.bid_state()
+            return
+
+        # an edit of a listing loaded before a bid or close must not write
+        # back the old bid state, which only bidding and closing update
+        if kwargs.get("update_fields") is None:
+            loaded = getattr(self, "_loaded_bid_state", {})
+            changed = [
+                name
+                for name, value in self.bid_state().items()
+                if name in loaded and loaded[name] != value
+            ]
+            if changed:
+                raise ValueError(
+                    f"Listing.save() doesn't write bid state, {', '.join(changed)} "
+                    "must be changed through auctions.bidding"
+                )
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in BID_STATE_FIELDS
+            ]
+        kwargs["update_fields"] = [*kwargs["update_fields"], "version"]
+        self.version = models.F("version") + 1
+
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            if "starting_bid" in kwargs["update_fields"]:
+                # still priced at the starting bid while nobody has bid
+                Listing.objects.filter(pk=self.pk, bid_count=0).update(
+                    current_price=self.starting_bid or 0
+                )
+        self.refresh_from_db(fields=["version", "current_price"])
+
+    @property
+    def has_ended(self):
+        """ Closed, or past its end time and waiting for the sweeper """
+
+        return self.closed or bool(self.ends_at and self.ends_at <= timezone.now())
+
     def get_bids(self):
         """ Return all bids for listing """
 
         return self.bids.all()
 
-    @property
-    def bid_count(self):
-        """ Returns the number of bids for a listing """
-
-        return self.get_bids().count()
-
     def get_highest_bid(self):
         """ Returns the highest bid for a listing """
 
@@ -64,25 +201,22 @@ class Listing(models.Model):
     @property
     def highest_bid_username(self):
         """
-        Return the highest bid amount if one exists, otherwise
-        the starting bid amount
+        Returns the username of the user with the highest bid if one exists
         """
 
         try:
-            return self.highest_bid.user.username
+            return self.high_bidder.username
         except AttributeError:
             return None
 
     @property
     def highest_bid_amount(self):
         """
-        Returns the username of the user with the highest bid if one exists
+        Return the highest bid amount if one exists, otherwise
+        the starting bid amount
         """
 
-        try:
-            return self.highest_bid.amount
-        except AttributeError:
-            return self.starting_bid
+        return self.current_price
 
 
 class Comment(models.Model):
@@ -93,6 +227,14 @@ class Comment(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["listing", "created_at", "id"],
+                name="comment_listing_created_idx",
+            ),
+        ]
+
     def __str__(self):
 
         return f"{self.user.username} on {self.listing.title} at {self.created_at}"
@@ -104,6 +246,13 @@ class Bid(models.Model):
     )
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="bids")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bids")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing", "-amount"], name="bid_listing_amount_idx"),
+            models.Index(fields=["created_at", "id"], name="bid_created_idx"),
+        ]
 
     def __str__(self):
 
@@ -123,7 +272,63 @@ class Watchlist(models.Model):
 
     class Meta:
         unique_together = ("user", "listing")
+        indexes = [
+            # the active (not soft-deleted) rows are the only ones ever read
+            models.Index(
+                fields=["user", "listing"],
+                name="watchlist_user_active_idx",
+                condition=models.Q(deleted=False),
+            ),
+        ]
+
+    def __str__(self):
+
+        return f"{self.user.username} watching {self.listing.title}"
+
+
+class Job(models.Model):
+    """
+    A background task run by the run_worker command, see auctions.jobs
+
+    Finished jobs are deleted, so the table only holds pending work and the
+    jobs that failed for good.
+    """
+
+    kind = models.CharField(max_length=32)
+    payload = models.JSONField(default=dict)
+    # not picked up before this time: the retry backoff, or the lease of the
+    # worker that claimed it
+    run_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["run_after"],
+                name="job_pending_idx",
+                condition=models.Q(failed=False),
+            ),
+        ]
+
+    def __str__(self):
+
+        return f"{self.kind} #{self.pk}"
+
+
+class JobCounter(models.Model):
+    """
+    How many jobs the workers finished with each outcome, kept in the
+    database because run_worker runs in its own process
+    """
+
+    outcome = models.CharField(max_length=16, primary_key=True)
+    count = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
 
-        return f"{self.user.username} - {self.user.watched_listings.count()} watched listings"
+        return f"{self.outcome}: {self.count}"
@@ -0,0 +1,165 @@
+""" Keyset (cursor) pagination for ordered querysets """
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_ORDERING = ("-created_at", "-pk")
+
+
+class KeysetPage:
+    """ One page of results plus opaque cursors for its neighbours """
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_other_pages(self):
+        return bool(self.next_cursor or self.prev_cursor)
+
+
+def paginate(queryset, cursor=None, page_size=25, ordering=DEFAULT_ORDERING):
+    """
+    Return the KeysetPage of queryset that follows or precedes the cursor
+
+    Pages are selected with a WHERE clause on the ordering columns rather than
+    an OFFSET, so every page costs the same as the first one. The last column
+    of the ordering must be unique (usually pk) to keep the order total.
+    """
+
+    model = queryset.model
+    fields = [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+    position = decode_cursor(model, fields, cursor)
+
+    if position is None:
+        rows = list(queryset.order_by(*ordering)[: page_size + 1])
+        has_more, has_previous = len(rows) > page_size, False
+
+    else:
+        values, forward = position
+        queryset = queryset.filter(keyset_filter(fields, values, forward))
+
+        if forward:
+            rows = list(queryset.order_by(*ordering)[: page_size + 1])
+            has_more, has_previous = len(rows) > page_size, True
+        else:
+            reverse = [name[1:] if name[0] == "-" else f"-{name}" for name in ordering]
+            rows = list(queryset.order_by(*reverse)[: page_size + 1])
+            has_more, has_previous = True, len(rows) > page_size
+
+    items = rows[:page_size]
+    if position is not None and not position[1]:
+        items.reverse()
+
+    page = KeysetPage(items)
+    if items and has_more:
+        page.next_cursor = encode_cursor(fields, items[-1], True)
+    if items and has_previous:
+        page.prev_cursor = encode_cursor(fields, items[0], False)
+
+    return page
+
+
+def keyset_filter(fields, values, forward):
+    """
+    Build the Q object selecting rows after (or before) the given values
+
+    For (a, b) descending that is a <= X AND (a < X OR b < Y) rather than
+    a < X OR (a = X AND b < Y): the leading bound on its own is a range the
+    ordering index can seek to, where an OR at the top level makes SQLite
+    scan the index from its start on every page.
+    """
+
+    condition = None
+    for (name, descending), value in reversed(list(zip(fields, values))):
+        strict, inclusive = ("lt", "lte") if descending == forward else ("gt", "gte")
+        if condition is None:
+            condition = Q(**{f"{name}__{strict}": value})
+        else:
+            condition = Q(**{f"{name}__{inclusive}": value}) & (
+                Q(**{f"{name}__{strict}": value}) | condition
+            )
+
+    return condition
+
+
+def encode_cursor(fields, item, forward):
+    """ Serialize the ordering values of item into an opaque cursor string """
+
+    return dump_cursor([getattr(item, name) for name, _ in fields], forward)
+
+
+def decode_cursor(model, fields, cursor):
+    """
+    Turn a cursor back into (values, forward), or None if it's missing or
+    malformed so that bad links fall back to the first page
+    """
+
+    position = load_cursor(cursor, len(fields))
+    if position is None:
+        return None
+
+    raw_values, forward = position
+    try:
+        values = [
+            (
+                model._meta.pk.to_python(value)
+                if name == "pk"
+                else model._meta.get_field(name).to_python(value)
+            )
+            for (name, _), value in zip(fields, raw_values)
+        ]
+    except ValidationError:
+        return None
+
+    return values, forward
+
+
+def cursor_value(value):
+    """
+    JSON encoding for cursor values; unlike DjangoJSONEncoder this keeps
+    microseconds, which the keyset comparison needs to be exact
+    """
+
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+
+    return str(value)
+
+
+def dump_cursor(values, forward):
+    """ Encode raw keyset values and a direction as an opaque string """
+
+    payload = json.dumps({"v": values, "f": forward}, default=cursor_value)
+
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def load_cursor(cursor, length):
+    """ Decode a dump_cursor string into (values, forward), or None if invalid """
+
+    if not cursor:
+        return None
+
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        values, forward = list(payload["v"]), bool(payload["f"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        return None
+
+    if len(values) != length:
+        return None
+
+    return values, forward
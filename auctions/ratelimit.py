@@ -0,0 +1,129 @@
+""" Cache-backed token buckets throttling the write endpoints """
+
+import functools
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+SCOPES = ["user", "ip"]
+
+# a bucket left alone this long is full again anyway, so it may expire
+BUCKET_TIMEOUT_MARGIN = 60
+
+
+def bucket_key(action, scope, identity):
+    return f"ratelimit:{action}:{scope}:{identity}"
+
+
+def take_token(key, burst, per_minute, now=None):
+    """
+    Take a token from the bucket stored at key, which holds up to burst
+    tokens and gains per_minute of them a minute. Returns 0 if a token was
+    taken, otherwise the seconds until the next one.
+
+    The read and write aren't atomic, so requests racing on the same bucket
+    can each take the last token: a few requests over the limit at worst.
+    """
+
+    now = time.time() if now is None else now
+    rate = per_minute / 60
+
+    tokens, updated = cache.get(key, (burst, now))
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+
+    cache.set(key, (tokens - 1, now), math.ceil(burst / rate) + BUCKET_TIMEOUT_MARGIN)
+
+    return 0
+
+
+def check_rate_limit(request, action):
+    """
+    Take a token from the client's IP address bucket, then from the user's,
+    for the action in settings.RATE_LIMITS. Returns 0 if the request may go
+    on, otherwise the seconds to wait, counting the rejection.
+
+    The IP check needs no query at all; the user check loads the session
+    and user, which the login_required views need anyway.
+    """
+
+    limit = settings.RATE_LIMITS[action]
+    ip_factor = settings.RATE_LIMIT_IP_FACTOR
+
+    wait = take_token(
+        bucket_key(action, "ip", request.META.get("REMOTE_ADDR")),
+        limit["burst"] * ip_factor,
+        limit["per_minute"] * ip_factor,
+    )
+    if wait:
+        record_rejection(action, "ip")
+        return wait
+
+    if request.user.is_authenticated:
+        wait = take_token(
+            bucket_key(action, "user", request.user.pk),
+            limit["burst"],
+            limit["per_minute"],
+        )
+        if wait:
+            record_rejection(action, "user")
+
+    return wait
+
+
+def rate_limited(get_action):
+    """
+    Throttle a view with check_rate_limit, before the view does anything
+
+    get_action(request) names the RATE_LIMITS action of the request, or
+    returns None for requests that aren't throttled. Throttled requests get
+    a 429 with a Retry-After header.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            action = get_action(request)
+            wait = check_rate_limit(request, action) if action else 0
+            if wait:
+                response = HttpResponse(
+                    "Too many requests, please try again shortly", status=429
+                )
+                response["Retry-After"] = math.ceil(wait)
+                return response
+
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def stats_key(action, scope):
+    return f"ratelimit_stats:{action}:{scope}"
+
+
+def record_rejection(action, scope):
+    key = stats_key(action, scope)
+    cache.add(key, 0, None)
+    cache.incr(key)
+
+
+def get_rate_limit_stats():
+    """ Rejected requests per action and scope since the counters started """
+
+    keys = {
+        (action, scope): stats_key(action, scope)
+        for action in settings.RATE_LIMITS
+        for scope in SCOPES
+    }
+    counters = cache.get_many(keys.values())
+
+    return {
+        action: {scope: counters.get(keys[action, scope], 0) for scope in SCOPES}
+        for action in settings.RATE_LIMITS
+    }
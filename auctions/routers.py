@@ -0,0 +1,65 @@
+""" Database router spreading reads over read replicas """
+
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# apps whose rows must never be read stale: a session written on login has
+# to be readable by the very next request
+PRIMARY_ONLY_APPS = {"sessions"}
+
+
+class RoutingState:
+    """ Per-request routing state, shared with the view's worker thread """
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+# set by ReplicaPinMiddleware for the duration of a request
+current_state = contextvars.ContextVar("current_routing_state", default=None)
+
+
+class ReplicaRouter:
+    """
+    Reads go to a random alias of settings.DATABASE_REPLICAS, writes to the
+    primary (default)
+
+    Reads stay on the primary when the request is pinned (it is unsafe, it
+    has written, or its session wrote recently, see ReplicaPinMiddleware),
+    inside a transaction, where they must see its writes, and for the apps
+    in PRIMARY_ONLY_APPS. Replicas are copies of the primary, nothing is
+    migrated on them.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+
+        state = current_state.get()
+        if state is not None and state.pinned:
+            return DEFAULT_DB_ALIAS
+
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = current_state.get()
+        if state is not None:
+            state.wrote = True
+            state.pinned = True
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,143 @@
+""" Full-text listing search backed by an SQLite FTS5 index """
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Listing
+from .pagination import KeysetPage, dump_cursor, load_cursor, paginate
+
+# Keep auctions_listing_fts in step with auctions_listing. Only open listings
+# are indexed, so closing a listing removes it from the results. Triggers also
+# cover bulk_create() and update(), which bypass model signals.
+SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS auctions_listing_fts_insert
+    AFTER INSERT ON auctions_listing WHEN NOT new.closed BEGIN
+        INSERT INTO auctions_listing_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS auctions_listing_fts_delete
+    AFTER DELETE ON auctions_listing WHEN NOT old.closed BEGIN
+        INSERT INTO auctions_listing_fts (auctions_listing_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS auctions_listing_fts_update
+    AFTER UPDATE OF title, description, closed ON auctions_listing BEGIN
+        INSERT INTO auctions_listing_fts (auctions_listing_fts, rowid, title, description)
+        SELECT 'delete', old.id, old.title, old.description WHERE NOT old.closed;
+        INSERT INTO auctions_listing_fts (rowid, title, description)
+        SELECT new.id, new.title, new.description WHERE NOT new.closed;
+    END
+    """,
+]
+
+SEARCH_TABLE = "auctions_listing_fts"
+
+SEARCH_TRIGGER_NAMES = [
+    "auctions_listing_fts_insert",
+    "auctions_listing_fts_delete",
+    "auctions_listing_fts_update",
+]
+
+SEARCH_SQL = """
+    SELECT rowid, bm25(auctions_listing_fts) AS score
+    FROM auctions_listing_fts
+    WHERE auctions_listing_fts MATCH %s {keyset}
+    ORDER BY score {direction}, rowid {direction}
+    LIMIT %s
+"""
+
+
+def install_search_triggers(using="default", **kwargs):
+    """
+    post_migrate handler that (re)creates the search index triggers
+
+    SQLite drops the triggers whenever a migration rebuilds auctions_listing,
+    so they're put back after every migrate; but only while the index itself
+    exists, as after migrating back past 0018 triggers writing to it would
+    break every change to a listing (and the next rebuild of the table).
+    """
+
+    search_connection = connections[using]
+    if search_connection.vendor != "sqlite":
+        return
+
+    with search_connection.cursor() as cursor:
+        if SEARCH_TABLE in search_connection.introspection.table_names(cursor):
+            for statement in SEARCH_TRIGGERS:
+                cursor.execute(statement)
+        else:
+            for trigger in SEARCH_TRIGGER_NAMES:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+
+def match_expression(query):
+    """
+    Turn user input into an FTS5 query: every word must match, as a prefix,
+    and quoting keeps FTS5 operators in the input from being interpreted
+    """
+
+    terms = ['"{}"*'.format(term.replace('"', '""')) for term in query.split()]
+
+    return " ".join(terms)
+
+
+def search_listings(query, cursor=None, page_size=25):
+    """ Return a KeysetPage of open listings matching query, best match first """
+
+    connection = connections[router.db_for_read(Listing)]
+    if connection.vendor != "sqlite":
+        return search_listings_like(query, cursor, page_size)
+
+    expression = match_expression(query)
+    if not expression:
+        return KeysetPage([])
+
+    position = load_cursor(cursor, 2)
+    forward = position is None or position[1]
+    params = [expression]
+    keyset = ""
+
+    if position is not None:
+        (score, listing_id), comparison = position[0], ">" if forward else "<"
+        keyset = (
+            f"AND (score {comparison} %s OR (score = %s AND rowid {comparison} %s))"
+        )
+        params += [score, score, listing_id]
+
+    sql = SEARCH_SQL.format(keyset=keyset, direction="ASC" if forward else "DESC")
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params + [page_size + 1])
+        rows = db_cursor.fetchall()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if not forward:
+        rows.reverse()
+
+    listings = Listing.objects.in_bulk([listing_id for listing_id, _ in rows])
+    page = KeysetPage([listings[pk] for pk, _ in rows if pk in listings])
+
+    if rows and (has_more or not forward):
+        page.next_cursor = dump_cursor([rows[-1][1], rows[-1][0]], True)
+    if rows and position is not None and (has_more or forward):
+        page.prev_cursor = dump_cursor([rows[0][1], rows[0][0]], False)
+
+    return page
+
+
+def search_listings_like(query, cursor, page_size):
+    """ Unranked fallback for databases without FTS5 """
+
+    condition = Q()
+    for term in query.split():
+        condition &= Q(title__icontains=term) | Q(description__icontains=term)
+
+    if not condition:
+        return KeysetPage([])
+
+    return paginate(Listing.objects.filter(condition, closed=False), cursor, page_size)
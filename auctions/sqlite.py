@@ -0,0 +1,18 @@
+""" Per-connection SQLite tuning """
+
+from django.conf import settings
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    connection_created handler that applies settings.SQLITE_PRAGMAS to every
+    new SQLite connection (journal_mode=wal sticks to the database file, the
+    others only last as long as the connection)
+    """
+
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
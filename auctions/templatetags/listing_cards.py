@@ -0,0 +1,21 @@
+""" Template tags for stitching cached listing cards into list pages """
+
+from django import template
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from auctions.caching import get_listing_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def listing_cards(listings):
+    """ The rendered cards of listings, from the fragment cache where possible """
+
+    card_template = get_template("auctions/listing_card.html")
+    cards = get_listing_cards(
+        list(listings), lambda listing: card_template.render({"listing": listing})
+    )
+
+    return mark_safe("".join(cards))
@@ -1,3 +1,660 @@
-from django.test import TestCase
+import decimal
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, router, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .bidding import BidError, close_auction, get_expired_listing_ids, place_bid
+from .jobs import HANDLERS, claim_jobs, enqueue, get_job_stats, run_jobs
+from .middleware import REPLICA_PIN_COOKIE
+from .models import Bid, Category, Job, Listing, User, Watchlist
+from .pagination import DEFAULT_ORDERING, dump_cursor, keyset_filter, paginate
+from .ratelimit import get_rate_limit_stats, take_token
+from .watchlist import unwatch_listings, watch_listings
+
+
+def create_listing(user, category, **fields):
+    return Listing.objects.create(
+        title="Lamp", description="A lamp", user=user, category=category, **fields
+    )
+
+
+class PlaceBidTests(TestCase):
+    """ The compare-and-set of auctions.bidding.place_bid """
+
+    def setUp(self):
+        self.seller = User.objects.create_user("seller")
+        self.bidder = User.objects.create_user("bidder")
+        self.other = User.objects.create_user("other")
+        self.listing = create_listing(
+            self.seller, Category.objects.create(title="Home"), starting_bid=10
+        )
+
+    def assertRejected(self, listing, user, amount, reason):
+        with self.assertRaisesMessage(BidError, reason):
+            place_bid(listing, user, decimal.Decimal(amount))
+
+    def test_first_bid_may_equal_starting_bid(self):
+        place_bid(self.listing, self.bidder, decimal.Decimal("10.00"))
+
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_price, decimal.Decimal("10.00"))
+        self.assertEqual(self.listing.bid_count, 1)
+        self.assertEqual(self.listing.high_bidder, self.bidder)
+
+    def test_first_bid_below_starting_bid_is_rejected(self):
+        self.assertRejected(self.listing, self.bidder, "9.99", "at least $10.00")
+
+    def test_later_bid_must_beat_current_price(self):
+        place_bid(self.listing, self.bidder, decimal.Decimal("10.00"))
+
+        self.assertRejected(self.listing, self.other, "10.00", "higher than")
+
+    def test_stale_listing_loses_compare_and_set(self):
+        stale = Listing.objects.get(pk=self.listing.pk)
+        place_bid(self.listing, self.bidder, decimal.Decimal("20.00"))
+
+        # stale still says 10.00, the UPDATE compares against the row
+        self.assertRejected(stale, self.other, "15.00", "current bid of $20.00")
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_price, decimal.Decimal("20.00"))
+        self.assertEqual(self.listing.high_bidder, self.bidder)
+        self.assertEqual(Bid.objects.count(), 1)
+
+    def test_own_listing_is_rejected(self):
+        self.assertRejected(self.listing, self.seller, "50.00", "your own listing")
+
+    def test_closed_listing_is_rejected(self):
+        self.assertTrue(close_auction(self.listing, self.seller))
+
+        self.assertRejected(self.listing, self.bidder, "50.00", "is closed")
+
+    def test_non_positive_bid_is_rejected(self):
+        self.assertRejected(self.listing, self.bidder, "0", "greater than $0.00")
+
+    def test_saving_stale_listing_keeps_bid_state(self):
+        stale = Listing.objects.get(pk=self.listing.pk)
+        place_bid(self.listing, self.bidder, decimal.Decimal("20.00"))
+
+        stale.title = "Desk lamp"
+        stale.save()
+
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.title, "Desk lamp")
+        self.assertEqual(self.listing.current_price, decimal.Decimal("20.00"))
+        self.assertEqual(self.listing.bid_count, 1)
+        self.assertEqual(self.listing.high_bidder, self.bidder)
+        self.assertEqual(self.listing.version, 3)
+
+    def test_new_starting_bid_reprices_until_first_bid(self):
+        self.listing.starting_bid = decimal.Decimal("12.00")
+        self.listing.save()
+        self.assertEqual(self.listing.current_price, decimal.Decimal("12.00"))
+
+        place_bid(self.listing, self.bidder, decimal.Decimal("15.00"))
+        self.listing.refresh_from_db()
+        self.listing.starting_bid = decimal.Decimal("5.00")
+        self.listing.save()
+        self.assertEqual(self.listing.current_price, decimal.Decimal("15.00"))
+
+    def test_saving_changed_bid_state_raises(self):
+        self.listing.closed = True
+
+        with self.assertRaisesMessage(ValueError, "closed"):
+            self.listing.save()
+        self.assertFalse(Listing.objects.get(pk=self.listing.pk).closed)
+
+
+class SweeperTests(TestCase):
+    """ The close_expired_listings sweep of timed auctions """
+
+    def setUp(self):
+        self.seller = User.objects.create_user("seller")
+        self.bidder = User.objects.create_user("bidder")
+        category = Category.objects.create(title="Home")
+        soon = timezone.now() + timedelta(minutes=1)
+        self.won, self.unsold, self.running = [
+            create_listing(self.seller, category, starting_bid=10, ends_at=soon)
+            for _ in range(3)
+        ]
+        place_bid(self.won, self.bidder, decimal.Decimal("12.00"))
+        Job.objects.all().delete()
+        Listing.objects.filter(pk__in=[self.won.pk, self.unsold.pk]).update(
+            ends_at=timezone.now() - timedelta(minutes=1)
+        )
+
+    def sweep(self):
+        call_command("close_expired_listings", stdout=StringIO())
+
+    def winner_jobs(self):
+        jobs = Job.objects.filter(kind="notify_winner")
+        return sorted(job.payload["listing_id"] for job in jobs)
+
+    def test_bid_after_end_is_rejected_before_sweep(self):
+        with self.assertRaisesMessage(BidError, "has ended"):
+            place_bid(self.unsold, self.bidder, decimal.Decimal("50.00"))
+
+    def test_sweep_closes_only_expired_listings(self):
+        self.sweep()
+
+        closed = Listing.objects.filter(closed=True).values_list("pk", flat=True)
+        self.assertEqual(set(closed), {self.won.pk, self.unsold.pk})
+
+    def test_winner_is_the_high_bidder(self):
+        self.sweep()
+
+        self.won.refresh_from_db()
+        self.unsold.refresh_from_db()
+        self.assertEqual(self.won.winner, self.bidder)
+        self.assertIsNotNone(self.won.closed_at)
+        self.assertIsNone(self.unsold.winner)
+
+    def test_jobs_are_queued_for_this_sweeps_winners(self):
+        def seller_closes_first(now, limit):
+            listing_ids = get_expired_listing_ids(now, limit)
+            if listing_ids:
+                # the seller closes it between the select and the UPDATE
+                close_auction(self.won, self.seller)
+            return listing_ids
+
+        with mock.patch(
+            "auctions.management.commands.close_expired_listings"
+            ".get_expired_listing_ids",
+            seller_closes_first,
+        ):
+            self.sweep()
+
+        # only close_auction's job, the sweep didn't close the listing
+        self.assertEqual(self.winner_jobs(), [self.won.pk])
+
+    def test_jobs_are_queued_for_winners_only(self):
+        self.sweep()
+
+        self.assertEqual(self.winner_jobs(), [self.won.pk])
+
+
+class ConcurrentBidTests(TransactionTestCase):
+    """
+    place_bid from many threads at once, against the file-backed test
+    database (DATABASES TEST NAME) so that SQLite locks as it does in use
+    """
+
+    THREADS = 8
+    BIDS_PER_THREAD = 15
+
+    def test_concurrent_bids_keep_a_consistent_summary(self):
+        seller = User.objects.create_user("seller")
+        bidders = [User.objects.create_user(f"bidder{i}") for i in range(self.THREADS)]
+        listing = create_listing(
+            seller, Category.objects.create(title="Home"), starting_bid=1
+        )
+        errors = []
+
+        def bid(user, step):
+            try:
+                for _ in range(self.BIDS_PER_THREAD):
+                    price = Listing.objects.values_list("current_price", flat=True)
+                    amount = price.get(pk=listing.pk) + step
+                    try:
+                        place_bid(listing, user, amount)
+                    except BidError:
+                        pass
+            except OperationalError as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=bid, args=(user, decimal.Decimal(i + 1) / 100))
+            for i, user in enumerate(bidders)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        bids = list(Bid.objects.order_by("pk").values_list("amount", "user"))
+        self.assertGreater(len(bids), self.BIDS_PER_THREAD)
+        amounts = [amount for amount, _ in bids]
+        # every accepted bid beat the one accepted before it
+        self.assertTrue(all(a < b for a, b in zip(amounts, amounts[1:])), amounts)
+
+        listing.refresh_from_db()
+        self.assertEqual(listing.current_price, amounts[-1])
+        self.assertEqual(listing.bid_count, len(bids))
+        self.assertEqual(listing.high_bidder_id, bids[-1][1])
+
+
+class PaginationTests(TestCase):
+    """ Keyset pages of auctions.pagination.paginate """
+
+    def setUp(self):
+        user = User.objects.create_user("seller")
+        category = Category.objects.create(title="Home")
+        self.listings = [create_listing(user, category) for _ in range(7)]
+        # newest first, ties on created_at broken by pk
+        self.ordered = sorted(
+            self.listings, key=lambda listing: (listing.created_at, listing.pk)
+        )[::-1]
+
+    def page(self, cursor=None):
+        return paginate(Listing.objects.all(), cursor, page_size=3)
+
+    def test_first_page(self):
+        page = self.page()
+
+        self.assertEqual(page.items, self.ordered[:3])
+        self.assertIsNone(page.prev_cursor)
+        self.assertIsNotNone(page.next_cursor)
+
+    def test_forward_to_last_page(self):
+        second = self.page(self.page().next_cursor)
+        last = self.page(second.next_cursor)
+
+        self.assertEqual(second.items, self.ordered[3:6])
+        self.assertEqual(last.items, self.ordered[6:])
+        self.assertIsNone(last.next_cursor)
+        self.assertIsNotNone(last.prev_cursor)
+
+    def test_back_to_first_page(self):
+        second = self.page(self.page().next_cursor)
+        first = self.page(second.prev_cursor)
+
+        self.assertEqual(first.items, self.ordered[:3])
+        self.assertIsNone(first.prev_cursor)
+        self.assertIsNotNone(first.next_cursor)
+
+    def test_malformed_cursors_fall_back_to_first_page(self):
+        for cursor in (
+            "not a cursor",
+            dump_cursor(["2020-01-01T00:00:00+00:00"], True),
+            dump_cursor(["yesterday", 1], True),
+        ):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.page(cursor).items, self.ordered[:3])
+
+    def test_deep_page_seeks_the_ordering_index(self):
+        fields = [("created_at", True), ("pk", True)]
+        last = self.ordered[-1]
+        for forward in (True, False):
+            queryset = Listing.objects.filter(
+                keyset_filter(fields, [last.created_at, last.pk], forward),
+                closed=False,
+            ).order_by(*(DEFAULT_ORDERING if forward else ("created_at", "pk")))
+            with self.subTest(forward=forward):
+                plan = queryset[:3].explain()
+                self.assertIn("SEARCH auctions_listing USING INDEX", plan)
+                self.assertRegex(plan, r"\(created_at[<>]\?\)")
+
+
+class WatchlistTests(TestCase):
+    """ Rowcounts of the idempotent watch and unwatch statements """
+
+    def setUp(self):
+        self.user = User.objects.create_user("watcher")
+        seller = User.objects.create_user("seller")
+        category = Category.objects.create(title="Home")
+        self.first = create_listing(seller, category)
+        self.second = create_listing(seller, category)
+
+    def active(self):
+        return set(
+            Watchlist.objects.filter(user=self.user, deleted=False).values_list(
+                "listing_id", flat=True
+            )
+        )
+
+    def test_watch_is_idempotent(self):
+        listing_ids = [self.first.pk, self.second.pk]
+
+        self.assertEqual(watch_listings(self.user, listing_ids), 2)
+        self.assertEqual(watch_listings(self.user, listing_ids), 0)
+        self.assertEqual(self.active(), set(listing_ids))
+
+    def test_unwatch_is_idempotent(self):
+        watch_listings(self.user, [self.first.pk, self.second.pk])
+
+        self.assertEqual(unwatch_listings(self.user, [self.first.pk]), 1)
+        self.assertEqual(unwatch_listings(self.user, [self.first.pk]), 0)
+        self.assertEqual(self.active(), {self.second.pk})
+
+    def test_watch_revives_unwatched_row(self):
+        watch_listings(self.user, [self.first.pk])
+        unwatch_listings(self.user, [self.first.pk])
+
+        self.assertEqual(watch_listings(self.user, [self.first.pk]), 1)
+        self.assertEqual(Watchlist.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(self.active(), {self.first.pk})
+
+    def test_unknown_listings_are_skipped(self):
+        self.assertEqual(watch_listings(self.user, [self.first.pk + 1000]), 0)
+        self.assertEqual(watch_listings(self.user, []), 0)
+        self.assertEqual(self.active(), set())
+
+
+@override_settings(
+    RATE_LIMITS={
+        "bid": {"burst": 2, "per_minute": 1},
+        "comment": {"burst": 2, "per_minute": 1},
+        "close_auction": {"burst": 2, "per_minute": 1},
+        "create_listing": {"burst": 1, "per_minute": 1},
+    },
+    RATE_LIMIT_IP_FACTOR=3,
+)
+class RateLimitTests(TestCase):
+    """ Token buckets of auctions.ratelimit """
+
+    def setUp(self):
+        cache.clear()
+        self.bidder = User.objects.create_user("bidder")
+        self.listing = create_listing(
+            User.objects.create_user("seller"),
+            Category.objects.create(title="Home"),
+        )
+        self.url = reverse("get_listing", args=(self.listing.pk,))
+
+    def bid(self, amount):
+        return self.client.post(self.url, {"place_bid": "1", "amount": amount})
+
+    def test_user_bucket_rejects_with_429(self):
+        self.client.force_login(self.bidder)
+        self.assertEqual(self.bid("1.00").status_code, 302)
+        self.assertEqual(self.bid("2.00").status_code, 302)
+
+        # the session and user, but nothing of the listing
+        with self.assertNumQueries(2):
+            response = self.bid("3.00")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "60")
+        self.assertEqual(Bid.objects.count(), 2)
+        self.assertEqual(get_rate_limit_stats()["bid"], {"user": 1, "ip": 0})
+
+    def test_ip_bucket_rejects_anonymous_clients(self):
+        statuses = [
+            self.client.post(reverse("create_listing")).status_code for _ in range(4)
+        ]
+
+        self.assertEqual(statuses, [302, 302, 302, 429])
+        self.assertEqual(get_rate_limit_stats()["create_listing"]["ip"], 1)
+
+    def test_pages_are_not_limited(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_bucket_refills(self):
+        self.assertEqual(take_token("bucket", 2, 60, now=0), 0)
+        self.assertEqual(take_token("bucket", 2, 60, now=0), 0)
+        self.assertEqual(take_token("bucket", 2, 60, now=0), 1)
+        self.assertEqual(take_token("bucket", 2, 60, now=0.5), 0.5)
+        self.assertEqual(take_token("bucket", 2, 60, now=1), 0)
+
+
+class RoutingTests(TestCase):
+    def test_non_numeric_ids_are_not_found(self):
+        for url in ("/category/abc", "/listing/abc", "/add_to_watchlist/abc"):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+def failing_job():
+    raise RuntimeError("mail server down")
+
+
+# as the test client does for requests, keep workers from closing the
+# connection holding the test's transaction
+@mock.patch("auctions.jobs.close_old_connections", lambda: None)
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_DELAY=30)
+class JobTests(TestCase):
+    """ Claiming, retrying and running the jobs of auctions.jobs """
+
+    LEASE = timedelta(minutes=5)
+
+    def setUp(self):
+        self.seller = User.objects.create_user("seller", "seller@example.com")
+        self.first = User.objects.create_user("first", "first@example.com")
+        self.second = User.objects.create_user("second", "second@example.com")
+        self.listing = create_listing(
+            self.seller, Category.objects.create(title="Home"), starting_bid=10
+        )
+
+    def run_due_jobs(self):
+        return run_jobs(claim_jobs(10, self.LEASE))
+
+    def make_due(self):
+        Job.objects.update(run_after=timezone.now())
+
+    def test_claimed_jobs_are_leased(self):
+        enqueue("notify_winner", listing_id=self.listing.pk)
+
+        self.assertEqual(len(claim_jobs(10, self.LEASE)), 1)
+        self.assertEqual(claim_jobs(10, self.LEASE), [])
+
+        # the worker died, the lease runs out
+        self.make_due()
+        self.assertEqual(claim_jobs(10, self.LEASE)[0].attempts, 2)
+
+    def test_racing_workers_never_share_a_job(self):
+        enqueue("notify_winner", listing_id=self.listing.pk)
+        update, raced = QuerySet.update, []
+
+        def racing_update(queryset, **kwargs):
+            # another worker claims the jobs this one has just selected
+            if not raced:
+                raced.append(None)
+                raced.append(claim_jobs(10, self.LEASE))
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", racing_update):
+            claimed = claim_jobs(10, self.LEASE)
+
+        self.assertEqual(claimed, [])
+        self.assertEqual(len(raced[1]), 1)
+
+    @mock.patch.dict(HANDLERS, {"fail": failing_job})
+    def test_retries_back_off_until_failed(self):
+        job = enqueue("fail")
+
+        for attempt, delay in enumerate((30, 60), start=1):
+            started = timezone.now()
+            self.assertEqual(self.run_due_jobs(), (0, 1, 0))
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            self.assertFalse(job.failed)
+            self.assertGreaterEqual(job.run_after, started + timedelta(seconds=delay))
+            self.assertLess(job.run_after, started + timedelta(seconds=delay + 5))
+            self.make_due()
+
+        self.assertEqual(self.run_due_jobs(), (0, 0, 1))
+        job.refresh_from_db()
+        self.assertTrue(job.failed)
+        self.assertEqual(job.last_error, "RuntimeError: mail server down")
+        self.assertEqual(claim_jobs(10, self.LEASE), [])
+
+    @mock.patch.dict(HANDLERS, {"fail": failing_job})
+    def test_counters_add_up_outcomes(self):
+        before = get_job_stats()
+        enqueue("fail")
+        enqueue("notify_winner", listing_id=self.listing.pk)
+
+        self.run_due_jobs()
+        stats = get_job_stats()
+
+        self.assertEqual(stats["done"], before["done"] + 1)
+        self.assertEqual(stats["retried"], before["retried"] + 1)
+        self.assertEqual(stats["failed"], before["failed"])
+        self.assertEqual(stats["pending"], 1)
+        self.assertEqual(stats["due"], 0)
+        self.assertIsNotNone(stats["last_batch_at"])
+
+    def test_outbid_email_goes_to_previous_leader(self):
+        place_bid(self.listing, self.first, decimal.Decimal("12.00"))
+        place_bid(self.listing, self.second, decimal.Decimal("15.00"))
+        # raising one's own bid doesn't outbid anyone
+        place_bid(self.listing, self.second, decimal.Decimal("20.00"))
+
+        self.assertEqual(self.run_due_jobs(), (3, 0, 0))
+        self.assertEqual(
+            [message.to for message in mail.outbox], [["first@example.com"]]
+        )
+        self.assertIn("$15.00", mail.outbox[0].body)
+
+    def test_winner_email_goes_to_high_bidder(self):
+        place_bid(self.listing, self.first, decimal.Decimal("12.00"))
+        place_bid(self.listing, self.second, decimal.Decimal("15.00"))
+        self.run_due_jobs()
+        mail.outbox.clear()
+
+        close_auction(self.listing, self.seller)
+        self.run_due_jobs()
+
+        self.assertEqual(
+            [message.to for message in mail.outbox], [["second@example.com"]]
+        )
+        self.assertEqual(mail.outbox[0].subject, "You won Lamp")
+
+
+class ConditionalGetTests(TestCase):
+    """ ETags and 304s of the listing page """
+
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user("seller")
+        self.viewer = User.objects.create_user("viewer")
+        self.listing = create_listing(
+            self.seller, Category.objects.create(title="Home"), starting_bid=10
+        )
+        self.url = reverse("get_listing", args=(self.listing.pk,))
+        self.client.force_login(self.viewer)
+
+    def get(self, etag=None):
+        if etag is None:
+            return self.client.get(self.url)
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+    def assertChanged(self, etag):
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_unchanged_page_is_304(self):
+        etag = self.get()["ETag"]
+
+        self.assertEqual(self.get(etag).status_code, 304)
+
+    def test_etag_varies_by_user(self):
+        etag = self.get()["ETag"]
+        self.client.force_login(self.seller)
+
+        self.assertChanged(etag)
+
+    def test_bid_changes_etag(self):
+        etag = self.get()["ETag"]
+        bidder = User.objects.create_user("bidder")
+        place_bid(self.listing, bidder, decimal.Decimal("12.00"))
+
+        self.assertChanged(etag)
+
+    def test_comment_changes_etag(self):
+        etag = self.get()["ETag"]
+        self.client.post(self.url, {"add_comment": "1", "body": "Does it work?"})
+
+        self.assertChanged(etag)
+
+    def test_watching_changes_etag(self):
+        etag = self.get()["ETag"]
+        self.client.get(reverse("add_to_watchlist", args=(self.listing.pk,)))
+
+        self.assertChanged(etag)
+
+    def test_flash_messages_are_never_304(self):
+        etag = self.get()["ETag"]
+        # rejected, below the starting bid
+        self.client.post(self.url, {"place_bid": "1", "amount": "5.00"})
+
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertContains(response, "at least $10.00")
+        self.assertEqual(self.get(etag).status_code, 304)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    ReplicaRouter and ReplicaPinMiddleware, with the replica alias mirroring
+    the test database; a TransactionTestCase, as reads inside a transaction
+    never go to a replica
+    """
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.bidder = User.objects.create_user("bidder")
+        self.listing = create_listing(
+            User.objects.create_user("seller"),
+            Category.objects.create(title="Home"),
+            starting_bid=10,
+        )
+        self.url = reverse("get_listing", args=(self.listing.pk,))
+
+    def queries(self, request):
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections["replica"]) as replica:
+                response = request()
+
+        return response, primary, replica
+
+    def sql(self, queries):
+        return " ".join(query["sql"] for query in queries)
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(router.db_for_read(Listing), "replica")
+
+        response, primary, replica = self.queries(lambda: self.client.get(self.url))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(primary), 0)
+        self.assertIn("auctions_listing", self.sql(replica))
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_sessions_and_transactions_read_primary(self):
+        self.assertEqual(router.db_for_read(Session), "default")
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(Listing), "default")
+
+        self.client.force_login(self.bidder)
+        _, primary, replica = self.queries(lambda: self.client.get(self.url))
+
+        self.assertIn("django_session", self.sql(primary))
+        self.assertNotIn("django_session", self.sql(replica))
+        self.assertIn("auctions_listing", self.sql(replica))
+
+    def test_writes_pin_to_primary(self):
+        self.client.force_login(self.bidder)
+
+        response, _, replica = self.queries(
+            lambda: self.client.post(self.url, {"place_bid": "1", "amount": "12.00"})
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(response.cookies[REPLICA_PIN_COOKIE]["max-age"], 10)
+
+        # the cookie keeps the next page on the primary, showing the bid
+        response, _, replica = self.queries(lambda: self.client.get(self.url))
+        self.assertEqual(len(replica), 0)
+        self.assertContains(response, "You currently have the highest bid")
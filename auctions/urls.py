@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import exports, views
 
 urlpatterns = [
     path("", views.index, name="index"),
@@ -9,21 +9,39 @@ urlpatterns = [
     path("logout", views.logout_view, name="logout"),
     path("register", views.register, name="register"),
     path("create_listing", views.create_listing, name="create_listing"),
-    path("listing/<str:listing_id>", views.get_listing, name="get_listing"),
+    path("listing/<int:listing_id>", views.get_listing, name="get_listing"),
+    path(
+        "listing/<int:listing_id>/comments",
+        views.get_listing_comments,
+        name="listing_comments",
+    ),
+    path(
+        "listing/<int:listing_id>/events",
+        views.listing_events,
+        name="listing_events",
+    ),
+    path("search", views.search, name="search"),
+    path("export/listings", exports.export_listings, name="export_listings"),
+    path("export/bids", exports.export_bids, name="export_bids"),
+    path("stats/cache", views.cache_stats, name="cache_stats"),
+    path("stats/jobs", views.job_stats, name="job_stats"),
+    path("stats/ratelimit", views.rate_limit_stats, name="rate_limit_stats"),
     path("categories", views.get_categories, name="categories"),
     path(
-        "category/<str:category_id>",
+        "category/<int:category_id>",
         views.get_categories_listings,
         name="category_listings",
     ),
+    path("dashboard", views.dashboard, name="dashboard"),
     path("watchlist", views.get_watchlist, name="watchlist"),
+    path("watchlist/update", views.update_watchlist, name="update_watchlist"),
     path(
-        "add_to_watchlist/<str:listing_id>",
+        "add_to_watchlist/<int:listing_id>",
         views.add_to_watchlist,
         name="add_to_watchlist",
     ),
     path(
-        "remove_from_watchlist/<str:listing_id>",
+        "remove_from_watchlist/<int:listing_id>",
         views.remove_from_watchlist,
         name="remove_from_watchlist",
     ),
@@ -5,14 +5,39 @@ import decimal
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Div, Field, Layout, Submit
 from django import forms
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.db import IntegrityError
-from django.http import HttpResponse, HttpResponseRedirect
-from django.shortcuts import render
+from django.db import IntegrityError, transaction
+from django.http import (
+    HttpResponse,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404, render
 from django.urls import reverse
-
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+
+from .bidding import BidError, BidSummary, close_auction, place_bid
+from .caching import get_active_categories, get_cache_stats
+from .conditional import (
+    category_listings_last_modified,
+    conditional_page,
+    listing_last_modified,
+    listings_last_modified,
+)
+from .dashboard import get_bidding_listings, get_own_listings, get_won_listings
+from .events import live_updates_enabled, publish_listing, stream_listing_events
+from .jobs import get_job_stats
 from .models import Bid, Category, Comment, Listing, User, Watchlist
+from .pagination import paginate
+from .ratelimit import get_rate_limit_stats, rate_limited
+from .search import search_listings
+from .watchlist import MAX_BULK_LISTINGS, unwatch_listings, watch_listings
 
 
 class ListingForm(forms.ModelForm):
@@ -25,9 +50,29 @@ class ListingForm(forms.ModelForm):
         self.helper.help_text_inline = True
         self.helper.add_input(Submit("submit", "Create Listing"))
 
+    def clean_ends_at(self):
+        ends_at = self.cleaned_data["ends_at"]
+        if ends_at and ends_at <= timezone.now():
+            raise forms.ValidationError("The end time must be in the future")
+
+        return ends_at
+
     class Meta:
         model = Listing
-        fields = ["category", "title", "description", "starting_bid", "image_url"]
+        fields = [
+            "category",
+            "title",
+            "description",
+            "starting_bid",
+            "image_url",
+            "ends_at",
+        ]
+        widgets = {
+            "ends_at": forms.DateTimeInput(
+                attrs={"type": "datetime-local"}, format="%Y-%m-%dT%H:%M"
+            )
+        }
+        help_texts = {"ends_at": "Leave empty to close the auction yourself"}
 
 
 class BidForm(forms.ModelForm):
@@ -96,25 +141,31 @@ class CloseListingForm(forms.ModelForm):
         fields = []
 
 
+@conditional_page(listings_last_modified)
 def index(request):
     """ Home page - Displays all active listings """
 
-    listings = Listing.objects.filter(closed=False).order_by("-created_at", "-pk")
+    listings = Listing.objects.filter(closed=False)
+    page = paginate(listings, request.GET.get("cursor"), settings.LISTINGS_PAGE_SIZE)
 
-    return render(request, "auctions/index.html", {"listings": listings})
+    return render(
+        request, "auctions/index.html", {"listings": page.items, "page": page}
+    )
 
 
 @login_required
 def add_listing_bid(request, listing):
     """ Add bid on listing """
 
-    if request.user.username != listing.user.username:
-        form = BidForm(request.POST)
+    form = BidForm(request.POST)
 
-        if form.is_valid():
-            bid_amount = form.cleaned_data["amount"]
-            bid = Bid(amount=bid_amount, user=request.user, listing=listing)
-            bid.save()
+    if form.is_valid():
+        try:
+            place_bid(listing, request.user, form.cleaned_data["amount"])
+        except BidError as error:
+            messages.error(request, str(error))
+        else:
+            transaction.on_commit(lambda: publish_listing(listing.pk))
 
     return HttpResponseRedirect(reverse("get_listing", args=(listing.id,)))
 
@@ -130,20 +181,32 @@ def add_listing_comment(request, listing):
         comment_body = form.cleaned_data["body"]
         comment = Comment(body=comment_body, listing=listing, user=request.user)
         comment.save()
+        Listing.objects.filter(pk=listing.pk).update(updated_at=comment.created_at)
 
     return HttpResponseRedirect(reverse("get_listing", args=(listing.id,)))
 
 
-def check_listing_on_watchlist(request, listing):
-    """ Check if the listing is on the current user's watchlist """
+def check_listing_on_watchlist(request, listing_id):
+    """
+    Check if the listing is on the current user's watchlist, once per
+    request: the listing page's ETag needs it as well
+    """
 
-    listing_on_watchlist = False
-    if request.user.is_authenticated:
-        watchlist_entry = Watchlist.objects.filter(user=request.user, listing=listing)
-        if watchlist_entry:
-            listing_on_watchlist = True
+    if not hasattr(request, "_listing_on_watchlist"):
+        request._listing_on_watchlist = (
+            request.user.is_authenticated
+            and Watchlist.objects.filter(
+                user=request.user, listing_id=listing_id, deleted=False
+            ).exists()
+        )
+
+    return request._listing_on_watchlist
+
+
+def listing_viewer_state(request, listing_id):
+    """ The per-user part of the listing page's ETag, its watchlist button """
 
-    return listing_on_watchlist
+    return "watching" if check_listing_on_watchlist(request, listing_id) else ""
 
 
 def set_listing(request, listing):
@@ -159,14 +222,14 @@ def set_listing(request, listing):
 
     if "close_auction" in request.POST:
 
-        listing.closed = True
-        listing.save()
+        if close_auction(listing, request.user):
+            transaction.on_commit(lambda: publish_listing(listing.pk))
 
         # always redirect on post to prevent form resubmission on refresh!
         return HttpResponseRedirect(reverse("get_listing", args=(listing.id,)))
 
 
-def get_active_listing(request, listing):
+def get_active_listing(request, listing, summary):
     """ View for active listings """
 
     close_listing_form = None
@@ -176,84 +239,123 @@ def get_active_listing(request, listing):
     listing_id = str(listing.id)
 
     # listing user
-    if listing.user.username == request.user.username:
+    if listing.user_id == request.user.id:
         close_listing_form = CloseListingForm(listing_id=listing_id)
 
-        if not listing.highest_bid_username:
+        if not summary.username:
             bid_message = "There are no bids on this listing"
-        elif listing.bid_count > 1:
-            bid_message = f"There are {listing.bid_count} bids on this listing ({listing.highest_bid_username} has the highest bid)"
+        elif summary.count > 1:
+            bid_message = f"There are {summary.count} bids on this listing ({summary.username} has the highest bid)"
         else:
-            bid_message = f"There is {listing.bid_count} bid on this listing ({listing.highest_bid_username} has the highest bid)"
+            bid_message = f"There is {summary.count} bid on this listing ({summary.username} has the highest bid)"
 
     # high-bid user
-    elif listing.highest_bid_username == request.user.username:
-        bid_form = BidForm(high_bid=listing.highest_bid_amount, listing_id=listing_id)
+    elif summary.username == request.user.username:
+        bid_form = BidForm(high_bid=summary.amount, listing_id=listing_id)
         bid_message = "You currently have the highest bid on this listing"
 
     # other authed user
     else:
-        bid_form = BidForm(high_bid=listing.highest_bid_amount, listing_id=listing_id)
+        bid_form = BidForm(high_bid=summary.amount, listing_id=listing_id)
         bid_message = "Enter a bid"
 
     return close_listing_form, bid_form, bid_message
 
 
-def get_closed_listing(request, listing):
+def get_closed_listing(request, listing, summary):
     """ View for closed listings """
 
     # listing user
-    if listing.user.username == request.user.username:
-        if not listing.highest_bid_username:
+    if listing.user_id == request.user.id:
+        if not summary.username:
             return "There were no bids on this listing"
 
-        return f"{listing.highest_bid_username} won the auction"
+        return f"{summary.username} won the auction"
 
     # high bid user
-    if listing.highest_bid_username == request.user.username:
+    if summary.username == request.user.username:
         return "You won this acution"
 
     # other authed user
     return "This auction is closed"
 
 
+def listing_events(request, listing_id):
+    """ Server-Sent Events stream of a listing's price, bid count and state """
+
+    listing = get_object_or_404(Listing.objects.only("pk"), pk=listing_id)
+
+    response = StreamingHttpResponse(
+        stream_listing_events(listing.pk), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+
+    return response
+
+
+# rate-limited actions of the listing page's forms, by submit button
+LISTING_ACTIONS = {
+    "place_bid": "bid",
+    "add_comment": "comment",
+    "close_auction": "close_auction",
+}
+
+
+def get_listing_action(request):
+    """ The RATE_LIMITS action of a listing page POST """
+
+    if request.method == "POST":
+        for button, action in LISTING_ACTIONS.items():
+            if button in request.POST:
+                return action
+
+    return None
+
+
+@rate_limited(get_listing_action)
+@conditional_page(listing_last_modified, listing_viewer_state)
 def get_listing(request, listing_id):
     """ Listing detail page - Allows users to place Bids on Listing """
 
-    listing = Listing.objects.get(pk=listing_id)
+    listing = get_object_or_404(
+        Listing.objects.select_related("user", "category", "high_bidder"),
+        pk=listing_id,
+    )
 
     if request.method == "POST":
         return set_listing(request, listing)
 
+    summary = BidSummary.for_listing(listing)
     bid_form = None
     bid_message = None
     close_listing_form = None
-    high_bid_amount = listing.highest_bid_amount
+    high_bid_amount = summary.amount
     high_bid_user = None
     comment_form = None
-    listing_on_watchlist = check_listing_on_watchlist(request, listing)
+    listing_on_watchlist = False
 
     # for authenticated users
     if request.user.is_authenticated:
 
-        listing_on_watchlist = check_listing_on_watchlist(request, listing)
-        comment_form = CommentForm(listing_id=listing_id)
+        listing_on_watchlist = check_listing_on_watchlist(request, listing.pk)
+        comment_form = CommentForm(listing_id=str(listing_id))
 
         # active listing logic
-        if not listing.closed:
+        if not listing.has_ended:
             close_listing_form, bid_form, bid_message = get_active_listing(
-                request, listing
+                request, listing, summary
             )
 
         # closed listing logic
         else:
-            bid_message = get_closed_listing(request, listing)
+            bid_message = get_closed_listing(request, listing, summary)
 
     else:
-        bid_form = BidForm(high_bid=listing.highest_bid_amount, listing_id=listing_id)
+        bid_form = BidForm(high_bid=summary.amount, listing_id=str(listing_id))
         bid_message = "Login to place a bid on this listing"
 
-    listing_comments = listing.comments.all()
+    comments_page = get_comments_page(listing.pk)
 
     return render(
         request,
@@ -265,50 +367,135 @@ def get_listing(request, listing_id):
             "bid_form": bid_form,
             "bid_message": bid_message,
             "close_listing_form": close_listing_form,
-            "listing_comments": listing_comments,
+            "comments_page": comments_page,
             "comment_form": comment_form,
             "listing_on_watchlist": listing_on_watchlist,
+            "live_updates": live_updates_enabled(request),
+        },
+    )
+
+
+def get_comments_page(listing_id, cursor=None):
+    """ A page of the listing's comments, oldest first, with their authors """
+
+    return paginate(
+        Comment.objects.filter(listing_id=listing_id).select_related("user"),
+        cursor,
+        settings.COMMENTS_PAGE_SIZE,
+        ordering=("created_at", "pk"),
+    )
+
+
+@conditional_page(listing_last_modified)
+def get_listing_comments(request, listing_id):
+    """ HTML fragment with the next page of a listing's comments """
+
+    return render(
+        request,
+        "auctions/comments.html",
+        {
+            "listing_id": listing_id,
+            "comments_page": get_comments_page(listing_id, request.GET.get("cursor")),
         },
     )
 
 
+def search(request):
+    """ Returns active listings matching the search query, best match first """
+
+    query = request.GET.get("q", "").strip()
+    page = search_listings(
+        query, request.GET.get("cursor"), settings.LISTINGS_PAGE_SIZE
+    )
+
+    return render(
+        request,
+        "auctions/search.html",
+        {"listings": page.items, "page": page, "query": query},
+    )
+
+
 def get_categories(request):
     """ Returns a list of categories with active listings """
 
-    categories = Category.objects.filter(listings__closed=False)
+    categories = get_active_categories()
 
     return render(request, "auctions/categories.html", {"categories": categories})
 
 
+@conditional_page(category_listings_last_modified)
 def get_categories_listings(request, category_id):
     """ Returns a list of active listings for a given category """
 
-    listings = Listing.objects.filter(category__id=category_id, closed=False)
-    category_title = listings[0].category.title
+    category = get_object_or_404(Category, pk=category_id)
+    listings = Listing.objects.filter(category=category, closed=False)
+    page = paginate(listings, request.GET.get("cursor"), settings.LISTINGS_PAGE_SIZE)
+    category_title = category.title
 
     return render(
         request,
         "auctions/category_listings.html",
-        {"listings": listings, "category_title": category_title},
+        {"listings": page.items, "page": page, "category_title": category_title},
     )
 
 
+@login_required
+def dashboard(request):
+    """ The user's bids with their standing, auctions won and own listings """
+
+    limit = settings.DASHBOARD_SECTION_SIZE
+
+    return render(
+        request,
+        "auctions/dashboard.html",
+        {
+            "bidding": get_bidding_listings(request.user, limit),
+            "won": get_won_listings(request.user, limit),
+            "own": get_own_listings(request.user, limit),
+        },
+    )
+
+
+@staff_member_required
+def cache_stats(request):
+    """ Hit and miss counts of the fragment caches """
+
+    return JsonResponse(get_cache_stats())
+
+
+@staff_member_required
+def job_stats(request):
+    """ Background job outcomes and queue depth """
+
+    return JsonResponse(get_job_stats())
+
+
+@staff_member_required
+def rate_limit_stats(request):
+    """ Requests rejected by the rate limits """
+
+    return JsonResponse(get_rate_limit_stats())
+
+
 @login_required
 def get_watchlist(request):
     """ Returns listings that user is watching """
 
-    listings = Listing.objects.filter(watched_listings__user=request.user)
+    listings = Listing.objects.filter(
+        watched_listings__user=request.user, watched_listings__deleted=False
+    )
+    page = paginate(listings, request.GET.get("cursor"), settings.LISTINGS_PAGE_SIZE)
 
-    return render(request, "auctions/watchlist.html", {"listings": listings})
+    return render(
+        request, "auctions/watchlist.html", {"listings": page.items, "page": page}
+    )
 
 
 @login_required
 def add_to_watchlist(request, listing_id):
     """ Adds the current listing to the current user's watchlist """
 
-    watched_listing = Watchlist(user=request.user, listing_id=listing_id)
-
-    watched_listing.save()
+    watch_listings(request.user, [listing_id])
 
     return HttpResponseRedirect(reverse("get_listing", args=(listing_id,)))
 
@@ -317,13 +504,40 @@ def add_to_watchlist(request, listing_id):
 def remove_from_watchlist(request, listing_id):
     """ Removes the current listing from the current user's watchlist """
 
-    watched_listing = Watchlist.objects.get(user=request.user, listing_id=listing_id)
-
-    watched_listing.delete()
+    unwatch_listings(request.user, [listing_id])
 
     return HttpResponseRedirect(reverse("get_listing", args=(listing_id,)))
 
 
+@login_required
+@require_POST
+def update_watchlist(request):
+    """
+    Watch or unwatch many listings at once: POST action=watch|unwatch and
+    one listing_id parameter per listing
+    """
+
+    action = request.POST.get("action")
+    if action not in ("watch", "unwatch"):
+        return JsonResponse({"error": "action must be watch or unwatch"}, status=400)
+
+    try:
+        listing_ids = sorted({int(pk) for pk in request.POST.getlist("listing_id")})
+    except ValueError:
+        return JsonResponse({"error": "listing ids must be integers"}, status=400)
+    if len(listing_ids) > MAX_BULK_LISTINGS:
+        return JsonResponse(
+            {"error": f"at most {MAX_BULK_LISTINGS} listings per request"}, status=400
+        )
+
+    if action == "watch":
+        changed = watch_listings(request.user, listing_ids)
+    else:
+        changed = unwatch_listings(request.user, listing_ids)
+
+    return JsonResponse({"action": action, "changed": changed})
+
+
 def login_view(request):
     if request.method == "POST":
 
@@ -380,28 +594,21 @@ def register(request):
         return render(request, "auctions/register.html")
 
 
+@rate_limited(lambda request: "create_listing" if request.method == "POST" else None)
 @login_required
 def create_listing(request):
     """ Create an auction listing """
 
+    form = ListingForm()
+
     if request.method == "POST":
-        category = Category.objects.get(pk=request.POST["category"])
-        title = request.POST["title"]
-        description = request.POST["description"]
-        image_url = request.POST["image_url"]
-        starting_bid = request.POST["starting_bid"]
-        user = request.user
-
-        listing = Listing(
-            title=title,
-            description=description,
-            category=category,
-            user=user,
-            image_url=image_url,
-            starting_bid=starting_bid,
-        )
-        listing.save()
+        form = ListingForm(request.POST)
 
-        return HttpResponseRedirect(reverse("index"))
+        if form.is_valid():
+            listing = form.save(commit=False)
+            listing.user = request.user
+            listing.save()
+
+            return HttpResponseRedirect(reverse("index"))
 
-    return render(request, "auctions/create_listing.html", {"form": ListingForm()})
+    return render(request, "auctions/create_listing.html", {"form": form})
@@ -0,0 +1,62 @@
+""" Idempotent watching and unwatching of listings """
+
+from django.db import connections, router
+from django.utils import timezone
+
+from .caching import invalidate_watchlist_count
+from .models import Watchlist
+
+# listings per bulk request, keeps the IN list under every backend's limits
+MAX_BULK_LISTINGS = 500
+
+# ON CONFLICT needs SQLite 3.24+ or PostgreSQL 9.5+, the SELECT skips ids of
+# listings that don't exist and the WHERE on the update skips rows that are
+# already watched, so a double click writes nothing
+WATCH_SQL = """
+    INSERT INTO auctions_watchlist (user_id, listing_id, deleted, created_at, modified_at)
+    SELECT %s, id, %s, %s, %s FROM auctions_listing WHERE id IN ({placeholders})
+    ON CONFLICT (user_id, listing_id) DO UPDATE
+    SET deleted = excluded.deleted, modified_at = excluded.modified_at
+    WHERE auctions_watchlist.deleted
+"""
+
+
+def watch_listings(user, listing_ids):
+    """
+    Put listings on the user's watchlist with a single upsert, reviving rows
+    that were soft-deleted. Returns the number of rows added or revived.
+    """
+
+    if not listing_ids:
+        return 0
+
+    connection = connections[router.db_for_write(Watchlist)]
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    sql = WATCH_SQL.format(placeholders=", ".join(["%s"] * len(listing_ids)))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user.pk, False, now, now, *listing_ids])
+        changed = cursor.rowcount
+
+    if changed:
+        invalidate_watchlist_count(user)
+
+    return changed
+
+
+def unwatch_listings(user, listing_ids):
+    """
+    Soft-delete listings from the user's watchlist with a single UPDATE.
+    Returns the number of rows removed.
+    """
+
+    if not listing_ids:
+        return 0
+
+    changed = Watchlist.objects.filter(
+        user=user, listing_id__in=listing_ids, deleted=False
+    ).update(deleted=True, modified_at=timezone.now())
+
+    if changed:
+        invalidate_watchlist_count(user)
+
+    return changed
@@ -7,10 +7,87 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 """
 
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'commerce.settings')
 
-application = get_asgi_application()
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    Django's ASGI handler, except that streaming responses are iterated in
+    a thread of their own
+
+    Django 3.1 iterates streaming content on the event loop, which blocks
+    every other request and fails outright for generators that query the
+    database (the export feeds). A single dedicated thread per response keeps
+    the generator, and the database cursor it holds, on one connection.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for c in response.cookies.values():
+            response_headers.append(
+                (b'Set-Cookie', c.output(header='').encode('ascii').strip())
+            )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers,
+        })
+
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1)
+        parts = iter(response)
+        try:
+            while True:
+                part = await loop.run_in_executor(executor, next, parts, None)
+                if part is None:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            # closing fires request_finished, which releases the database
+            # connection of the thread that did the iterating
+            await loop.run_in_executor(executor, response.close)
+            executor.shutdown(wait=False)
+
+
+django.setup(set_prefix=False)
+django_application = StreamingASGIHandler()
+
+from auctions.events import (  # noqa: E402
+    EVENTS_PATH,
+    STREAMING_SCOPE_KEY,
+    listing_events_asgi,
+)
+
+
+async def application(scope, receive, send):
+    # listing event streams are long-lived, serve them outside Django's
+    # request handling so that each one is a coroutine, not a blocked thread
+    if scope["type"] == "http" and EVENTS_PATH.match(scope["path"]):
+        return await listing_events_asgi(scope, receive, send)
+
+    # lets pages know they may open event streams (live_updates_enabled)
+    return await django_application(
+        {**scope, STREAMING_SCOPE_KEY: True}, receive, send
+    )
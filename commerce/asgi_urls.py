@@ -0,0 +1,12 @@
+"""commerce URL Configuration for ASGI
+
+The same URLs as commerce.urls, with the auctions read-only pages served by
+async views. Selected per request by auctions.middleware.asgi_urlconf_middleware.
+"""
+from django.contrib import admin
+from django.urls import include, path
+
+urlpatterns = [
+    path("admin/", admin.site.urls),
+    path("", include("auctions.async_urls"))
+]
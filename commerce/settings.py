@@ -32,7 +32,7 @@ CRISPY_TEMPLATE_PACK = "bootstrap3"
 # Application definition
 
 INSTALLED_APPS = [
-    "auctions",
+    "auctions.apps.AuctionsConfig",
     "crispy_forms",
     "django.contrib.admin",
     "django.contrib.auth",
@@ -44,22 +44,38 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "auctions.middleware.ReplicaPinMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "auctions.middleware.QueryInstrumentationMiddleware",
+    "auctions.middleware.asgi_urlconf_middleware",
 ]
 
 ROOT_URLCONF = "commerce.urls"
 
+# URLs used under commerce.asgi, with async versions of the read-only views
+ASGI_URLCONF = "commerce.asgi_urls"
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # compiled templates are kept for the life of the process, even
+            # with DEBUG on, restart the server to pick up template edits
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -81,11 +97,117 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        # keep connections (one per server thread) open between requests
+        "CONN_MAX_AGE": 60,
+        # a file rather than Django's shared-cache in-memory database, so
+        # that threaded tests lock the way the real database does
+        "TEST": {"NAME": os.path.join(BASE_DIR, "test_db.sqlite3")},
+    },
+    # a copy of the primary refreshed by the sync_replica command, only read
+    # from when listed in DATABASE_REPLICAS; tests read the primary through it
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, "replica.sqlite3"),
+        "CONN_MAX_AGE": 60,
+        "TEST": {"MIRROR": "default"},
+    },
+}
+
+# PRAGMAs run on every new SQLite connection (auctions.sqlite). WAL lets reads
+# carry on while a bid is written, writers wait up to busy_timeout ms for the
+# write lock instead of failing with "database is locked", synchronous=normal
+# is durable in WAL mode short of power loss, and reads are served from mmap
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "busy_timeout": 5000,
+    "synchronous": "normal",
+    "mmap_size": 256 * 1024 * 1024,
+}
+
+# Read replicas (aliases in DATABASES) that auctions.routers.ReplicaRouter
+# sends reads to, e.g. ["replica"] to try it locally with a second SQLite file
+DATABASE_REPLICAS = []
+
+DATABASE_ROUTERS = ["auctions.routers.ReplicaRouter"]
+
+# Seconds a browser keeps reading from the primary after it writes, longer
+# than the replicas are expected to lag behind
+REPLICA_PIN_SECONDS = 10
+
+# LocMemCache is per process. Running several server processes (or workers)
+# needs a shared backend such as memcached or redis, or the invalidations of
+# auctions.caching (watchlist counts) and the rate limit buckets only reach
+# the process that made them
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
 
 AUTH_USER_MODEL = "auctions.User"
 
+# Token buckets of the rate-limited actions (auctions.ratelimit): every user
+# can make burst requests at once, refilled at per_minute
+RATE_LIMITS = {
+    "bid": {"burst": 10, "per_minute": 30},
+    "comment": {"burst": 5, "per_minute": 10},
+    "close_auction": {"burst": 5, "per_minute": 10},
+    "create_listing": {"burst": 5, "per_minute": 10},
+}
+
+# Buckets per IP address are this many times larger, users can share one
+RATE_LIMIT_IP_FACTOR = 5
+
+# Background jobs (auctions.jobs) are tried this many times, waiting
+# JOB_RETRY_DELAY seconds after the first failure, doubled after each one
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 30
+
+# Notification emails are printed by the development server
+EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+
+# Number of listings per page on the index, category and watchlist pages
+LISTINGS_PAGE_SIZE = 25
+
+# Most recent listings shown in each section of the dashboard
+DASHBOARD_SECTION_SIZE = 50
+
+# Number of comments shown on a listing page, and loaded per "Show more"
+COMMENTS_PAGE_SIZE = 20
+
+# Rows fetched per database round trip by the streaming export feeds
+EXPORT_CHUNK_SIZE = 2000
+
+# Live listing updates (Server-Sent Events): seconds between keepalives (and
+# the longest wait of a long poll on sync servers), seconds before a stream
+# ends under commerce.asgi (browsers reconnect), events buffered per client
+LISTING_EVENTS_KEEPALIVE = 15
+LISTING_EVENTS_MAX_DURATION = 300
+LISTING_EVENTS_BUFFER = 16
+
+# Per-request query/template timing (Server-Timing header + log line)
+QUERY_INSTRUMENTATION = False
+# How many of the slowest statements to include in the log line
+QUERY_INSTRUMENTATION_SLOWEST = 3
+# Warn when the same SQL shape runs more than this many times in one request
+QUERY_INSTRUMENTATION_N_PLUS_ONE = 5
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        }
+    },
+    "loggers": {
+        "auctions": {
+            "level": "INFO",
+            "handlers": ["console"],
+        }
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 